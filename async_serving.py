@@ -0,0 +1,181 @@
+# ⚡ Asyncio Serving Mode - aiohttp + python-socketio on a single event loop
+
+import asyncio
+import socketio
+from aiohttp import web
+from metrics import Histogram
+from idempotency import with_idempotency_key
+from long_poll import LongPoll
+from payload_cache import SocketJSON
+from log_export import ExportStream
+from request_errors import RequestError
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Idempotency-Key'
+}
+
+class AsyncioSequencer:
+    """Runs signal sequences as coroutines, in place of the TimerScheduler thread"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.in_flight = 0
+        self.fired = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.lag = Histogram()
+
+    def run_sequence(self, steps):
+        coro = self._run(steps)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run_coroutine_threadsafe(coro, self.loop)
+        else:
+            self.loop.create_task(coro)
+
+    async def _run(self, steps):
+        self.in_flight += 1
+        try:
+            for delay, callback, args in steps:
+                if delay:
+                    due = self.loop.time() + delay
+                    await asyncio.sleep(delay)
+                    lag = self.loop.time() - due
+                    self.last_lag = lag
+                    if lag > self.max_lag:
+                        self.max_lag = lag
+                    self.lag.record(lag * 1e9)
+                self.fired += 1
+                callback(*args)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {
+            'mode': 'asyncio',
+            'queue_depth': self.in_flight,
+            'timers_fired': self.fired,
+            'last_lag_ms': round(self.last_lag * 1000, 3),
+            'max_lag_ms': round(self.max_lag * 1000, 3)
+        }
+
+class AsyncTrafficServer:
+    """Serves a TrafficService's api_routes and dashboard on aiohttp.
+
+    The service keeps its state, phases and handlers; this class only swaps its
+    scheduler for coroutine-based sequences and its emitter for the async
+    Socket.IO server, so Flask mode stays untouched.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.sio = socketio.AsyncServer(async_mode='aiohttp', cors_allowed_origins='*', json=SocketJSON)
+        self.app = web.Application(middlewares=[self._cors_middleware])
+        self.sio.attach(self.app)
+
+        server.scheduler = AsyncioSequencer(self.loop)
+        server.emit_event = self.emit
+
+        self.app.router.add_get('/metrics', self._metrics)
+        for path in server.pages.paths():
+            self.app.router.add_get(path, self._page(path))
+        for method, path, handler in server.api_routes:
+            self.app.router.add_route(method, path, self._wrap(handler))
+        self.sio.on('connect', self._on_connect)
+        self.sio.on('disconnect', self._on_disconnect)
+        for event, handler in server.socket_handlers.items():
+            self.sio.on(event, self._wrap_socket(handler))
+
+    def emit(self, event, data=None, **kwargs):
+        coro = self.sio.emit(event, data, **kwargs)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Broadcaster thread: wait for the send, so emit timings cover the real work
+            asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+        else:
+            self.loop.create_task(coro)
+
+    def _wrap(self, handler):
+        async def endpoint(request):
+            data = dict(request.query)
+            if request.can_read_body:
+                try:
+                    body = await request.json()
+                except ValueError:
+                    body = None
+                if isinstance(body, dict):
+                    data.update(body)
+                else:
+                    data = body  # JSON-RPC batches are lists; None means unparseable
+            data = with_idempotency_key(data, request.headers)
+            try:
+                result = handler(data)
+            except RequestError as exc:
+                return web.json_response(exc.body(), status=exc.status)
+            if isinstance(result, ExportStream):
+                return await self._stream(request, result)
+            if isinstance(result, LongPoll):
+                result = await result.wait_async()  # Awaits a future; no thread is parked
+                if result is None:
+                    return web.Response(status=304)
+            elif result is None:
+                return web.Response(status=204)
+            if isinstance(result, bytes):
+                return web.Response(body=result, content_type='application/json')  # Pre-serialized
+            return web.json_response(result)
+        return endpoint
+
+    async def _stream(self, request, export):
+        headers, chunks = export.open(request.headers.get('Accept-Encoding'))
+        response = web.StreamResponse(headers=headers)
+        await response.prepare(request)
+        while True:
+            # Each chunk is built on a worker thread so the loop keeps serving other requests
+            chunk = await self.loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                break
+            await response.write(chunk)
+        await response.write_eof()
+        return response
+
+    async def _on_connect(self, sid, environ, auth=None):
+        await self.sio.enter_room(sid, self.server.socket_connected(sid, auth))
+
+    async def _on_disconnect(self, sid, reason=None):
+        self.server.socket_disconnected(sid)
+
+    async def _metrics(self, request):
+        return web.Response(body=self.server.metrics.render().encode('utf-8'), headers={
+            'Content-Type': 'text/plain; version=0.0.4; charset=utf-8',
+            'Cache-Control': 'no-store'
+        })
+
+    def _wrap_socket(self, handler):
+        async def on_event(sid, data=None):
+            return handler(data)  # Returned to the client as the ack
+        return on_event
+
+    def _page(self, path):
+        async def page(request):
+            status, headers, body = self.server.pages.respond(path, request.headers)
+            return web.Response(body=body, status=status, headers=headers)
+        return page
+
+    @web.middleware
+    async def _cors_middleware(self, request, handler):
+        if request.path.startswith('/socket.io'):
+            return await handler(request)  # engine.io handles its own CORS
+        if request.method == 'OPTIONS':
+            return web.Response(headers=CORS_HEADERS)
+        response = await handler(request)
+        response.headers.update(CORS_HEADERS)
+        return response
+
+    def run(self, host='0.0.0.0', port=5000):
+        web.run_app(self.app, host=host, port=port, loop=self.loop, print=None)
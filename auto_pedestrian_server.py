@@ -1,110 +1,29 @@
 # 🚦 Auto Pedestrian Traffic Server
 
-from flask import Flask, jsonify, request, render_template_string
-import threading
-import time
-import datetime
-from flask_socketio import SocketIO, emit
-from flask_cors import CORS
+from phase_engine import VEHICLE
+from phase_plans import AUTO_PLAN
+from sharded_stats import ShardedCounters
+from traffic_service import TrafficService
 
-app = Flask(__name__)
-CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Counts accepted vehicle switches (started or joined); rejections are logged but not counted
+request_counters = ShardedCounters(['total_requests', 'vehicle_requests'])
 
-traffic_state = {
-    'road1': 'RED',
-    'road2': 'GREEN',
-    'pedestrian1': 'RED',
-    'pedestrian2': 'RED'
-}
+service = TrafficService(__name__, 'auto_pedestrian', AUTO_PLAN, request_counters)
+app = service.app
+socketio = service.socketio
+add_log = service.add_log
 
-log_entries = []
-system_stats = {
-    'total_requests': 0,
-    'vehicle_requests': 0,
-    'server_start_time': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-}
+# Commands - called with the junction lock held, by /api/control_vehicle and /api/rpc.
+# Pedestrian signals follow the roads: the plan recomputes them when a road turns GREEN
 
-lock = threading.Lock()
+def start_vehicle_switch(junction, params, log=add_log):
+    result = service.engine.start(junction, VEHICLE, params.get('road_id'), log)
+    if result['success']:
+        request_counters.incr('total_requests')
+        request_counters.incr('vehicle_requests')
+    return result
 
-def add_log(log_type, action, message):
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = {
-        'timestamp': timestamp,
-        'type': log_type,
-        'action': action,
-        'message': message
-    }
-    log_entries.append(log_entry)
-    if len(log_entries) > 100:
-        log_entries.pop(0)
-    socketio.emit('log_update', {
-        'logs': log_entries[-10:],
-        'stats': system_stats
-    })
-
-# Automatically update pedestrian signals based on road state
-
-def update_pedestrian_signals():
-    # If road is RED, pedestrian can cross (GREEN)
-    traffic_state['pedestrian1'] = 'GREEN' if traffic_state['road1'] == 'RED' else 'RED'
-    traffic_state['pedestrian2'] = 'GREEN' if traffic_state['road2'] == 'RED' else 'RED'
-    socketio.emit('update', traffic_state)
-
-@app.route('/api/control_vehicle', methods=['POST'])
-def control_vehicle():
-    data = request.get_json()
-    road_id = data.get('road_id')
-    with lock:
-        if traffic_state[f'road{road_id}'] == 'GREEN':
-            add_log('VEHICLE', f'Switch to Road {road_id}', f"Road {road_id} is already GREEN")
-            return jsonify({"success": False, "message": f"Road {road_id} is already GREEN"})
-    def vehicle_sequence():
-        other_road_id = 2 if road_id == 1 else 1
-        with lock:
-            traffic_state[f'road{other_road_id}'] = 'YELLOW'
-            traffic_state[f'road{road_id}'] = 'RED'
-            socketio.emit('update', traffic_state)
-            add_log('VEHICLE', f'Switch to Road {road_id}', f"Road {other_road_id} changed to YELLOW")
-        time.sleep(3)
-        with lock:
-            traffic_state[f'road{other_road_id}'] = 'RED'
-            socketio.emit('update', traffic_state)
-            add_log('VEHICLE', f'Switch to Road {road_id}', f"Road {other_road_id} changed to RED")
-        time.sleep(2)
-        with lock:
-            traffic_state[f'road{road_id}'] = 'GREEN'
-            socketio.emit('update', traffic_state)
-            add_log('VEHICLE', f'Switch to Road {road_id}', f"Road {road_id} changed to GREEN")
-            update_pedestrian_signals()
-    threading.Thread(target=vehicle_sequence, daemon=True).start()
-    system_stats['total_requests'] += 1
-    system_stats['vehicle_requests'] += 1
-    add_log('VEHICLE', f'Switch to Road {road_id}', 'Traffic switch sequence started')
-    return jsonify({"success": True, "message": f"Traffic switch to Road {road_id} initiated successfully"})
-
-@app.route('/api/status')
-def get_status():
-    with lock:
-        return jsonify({
-            'traffic_state': traffic_state,
-            'logs': log_entries[-10:],
-            'stats': system_stats
-        })
-
-@app.route('/api/logs')
-def get_logs():
-    return jsonify({
-        'logs': log_entries,
-        'stats': system_stats
-    })
-
-@app.route('/api/clear_logs', methods=['POST'])
-def clear_logs():
-    global log_entries
-    log_entries = []
-    add_log('SYSTEM', 'Clear Logs', 'All logs cleared by user')
-    return jsonify({"success": True, "message": "Logs cleared successfully"})
+control_vehicle_rpc = service.command('control_vehicle', start_vehicle_switch)
 
 # Enhanced Dashboard with Logs (Complete UI)
 ENHANCED_DASHBOARD_HTML = """
@@ -113,7 +32,7 @@ ENHANCED_DASHBOARD_HTML = """
 <head>
     <title>🚦 Auto Pedestrian Traffic Control Dashboard</title>
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.0.0/socket.io.js"></script>
+    <script src="/vendor/socket.io-4.8.1.min.js"></script>
     <style>
         * { margin: 0; padding: 0; box-sizing: border-box; }
         body { 
@@ -298,9 +217,38 @@ ENHANCED_DASHBOARD_HTML = """
     </div>
 
     <script>
-        const socket = io();
+        // Packed binary states (state_codec.py) unless the page is opened with ?binary=0
+        const BINARY_FRAMES = new URLSearchParams(window.location.search).get('binary') !== '0';
+        const socket = io({ auth: { binary: BINARY_FRAMES } });
+        
+        const SIGNALS = ['road1', 'road2', 'pedestrian1', 'pedestrian2'];
+        const COLOURS = ['RED', 'YELLOW', 'GREEN'];
+        const utf8 = new TextDecoder();
+        
+        function decodeStates(data) {
+            const bytes = data instanceof ArrayBuffer ? new Uint8Array(data) : data;
+            const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+            const count = view.getUint16(1, true);  // Byte 0 is the format version
+            let offset = 3;
+            const states = [];
+            for (let i = 0; i < count; i++) {
+                const idLength = view.getUint16(offset, true);
+                const state = { junction_id: utf8.decode(bytes.subarray(offset + 2, offset + 2 + idLength)) };
+                offset += 2 + idLength;
+                state.version = view.getUint32(offset, true);
+                const packed = view.getUint8(offset + 4);
+                offset += 5;
+                SIGNALS.forEach((signal, index) => { state[signal] = COLOURS[(packed >> (2 * index)) & 3]; });
+                states.push(state);
+            }
+            return states;
+        }
+        const JUNCTION_ID = new URLSearchParams(window.location.search).get('junction_id') || 'main';
         
         function updateTrafficLights(state) {
+            if (!state) return;  // Unknown junction: nothing to show until a command creates it
+            stateVersion = state.version;
+            
             // Reset all lights
             document.querySelectorAll('.light').forEach(light => {
                 light.classList.remove('red', 'yellow', 'green');
@@ -374,39 +322,99 @@ ENHANCED_DASHBOARD_HTML = """
         
         async function fetchStatus() {
             try {
-                const response = await fetch('/api/status');
+                const response = await fetch(`/api/status?junction_id=${encodeURIComponent(JUNCTION_ID)}`);
+                if (!response.ok) return;
                 const data = await response.json();
                 updateTrafficLights(data.traffic_state);
                 updateStats(data.stats);
-                updateLogs(data.logs);
+                applyLogDelta({ logs: data.logs, reset: true });
             } catch (error) {
                 console.error('Error fetching status:', error);
             }
         }
         
+        // Long-poll fallback while the socket is down: the server answers as soon as the
+        // junction version moves past ours, or with an empty 304 after 25 seconds
+        let stateVersion = 0;
+        let longPolling = false;
+        
+        async function longPoll() {
+            if (longPolling) return;
+            longPolling = true;
+            while (!socket.connected) {
+                try {
+                    const response = await fetch(`/api/status?junction_id=${encodeURIComponent(JUNCTION_ID)}&since=${stateVersion}&timeout=25`);
+                    if (response.status === 200) {
+                        const data = await response.json();
+                        updateTrafficLights(data.traffic_state);
+                        updateStats(data.stats);
+                        applyLogDelta({ logs: data.logs, reset: true });
+                    } else if (response.status !== 304) {
+                        await new Promise(resolve => setTimeout(resolve, 2000));  // e.g. 404: back off
+                    }
+                } catch (error) {
+                    await new Promise(resolve => setTimeout(resolve, 2000));
+                }
+            }
+            longPolling = false;
+        }
+        
+        // Log deltas - the server only sends entries we have not seen, keyed by seq
+        let logBuffer = [];
+        let lastSeq = 0;
+        let logEpoch = null;  // Seqs start over when the server restarts; a new epoch means start over too
+        
+        function applyLogDelta(data) {
+            const restarted = data.log_epoch !== undefined && logEpoch !== null && data.log_epoch !== logEpoch;
+            if (data.log_epoch !== undefined) logEpoch = data.log_epoch;
+            const reset = data.reset || restarted;
+            const fresh = reset ? data.logs : data.logs.filter(log => log.seq > lastSeq);
+            if (reset) {
+                logBuffer = [];
+                lastSeq = 0;
+            }
+            if (fresh.length === 0 && !reset) return;
+            logBuffer = logBuffer.concat(fresh).slice(-10);
+            if (fresh.length > 0) lastSeq = fresh[fresh.length - 1].seq;
+            updateLogs(logBuffer);
+        }
+        
+        function resume() {
+            socket.emit('resume', { last_seq: lastSeq, log_epoch: logEpoch, junction_id: JUNCTION_ID }, function(data) {
+                if (data.success === false) return;  // Unknown junction; frames bring it once it exists
+                updateTrafficLights(data.traffic_state);
+                updateStats(data.stats);
+                applyLogDelta(data);
+                if (data.more) resume();
+            });
+        }
+        
         // Socket.IO real-time updates
-        socket.on('update', function(state) {
-            updateTrafficLights(state);
-        });
+        socket.on('connect', resume);  // Also fires on reconnect: fetch only what we missed
+        socket.on('disconnect', longPoll);
+        socket.on('connect_error', longPoll);
         
-        socket.on('log_update', function(data) {
-            updateStats(data.stats);
-            updateLogs(data.logs);
+        // One frame per server tick: latest state per junction plus the new log entries
+        socket.on('frame', function(frame) {
+            const states = Array.isArray(frame.states) ? frame.states : decodeStates(frame.states);
+            states.forEach(function(state) {
+                if (state.junction_id === JUNCTION_ID) updateTrafficLights(state);
+            });
+            if (frame.stats) {
+                updateStats(frame.stats);
+                applyLogDelta(frame);
+            }
         });
         
-        // Initial load and periodic refresh
+        // Initial load; after that the socket keeps us current
         fetchStatus();
-        setInterval(fetchStatus, 5000);
     </script>
 </body>
 </html>
 """
 
-@app.route('/')
-def dashboard():
-    return render_template_string(ENHANCED_DASHBOARD_HTML)
+service.add_dashboard(ENHANCED_DASHBOARD_HTML)
 
 if __name__ == '__main__':
-    add_log('SYSTEM', 'Server Start', 'Auto pedestrian traffic server started successfully')
-    print("🚦 Auto Pedestrian Traffic Server running at http://localhost:5000")
-    socketio.run(app, debug=True, port=5000)
+    service.main('Auto pedestrian traffic server', 'Auto pedestrian traffic server started successfully',
+                 "🚦 Auto Pedestrian Traffic Server running at http://localhost:{port}")
@@ -0,0 +1,256 @@
+# 🏁 Control RPC Benchmark - open-loop (Poisson) and closed-loop load against a real server
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+from metrics import Histogram
+
+SERVERS = {
+    'enhanced': 'enhanced_rpc_server.py',
+    'auto': 'auto_pedestrian_server.py'
+}
+
+def random_road(rng):
+    """Same mapping as the Auto Random button: 1-2 -> Road 1, 3-4 -> Road 2"""
+    number = rng.randint(1, 4)
+    return 1 if number <= 2 else 2
+
+class Tally:
+    """Raw outcomes from one worker process, merged by the parent"""
+
+    def __init__(self):
+        self.latencies_ns = []
+        self.errors = 0    # Transport failures, timeouts and non-2xx responses
+        self.rejected = 0  # 200 with success: false, e.g. "Road 1 is already GREEN"
+
+async def send(session, url, rng, junctions, tally, intended_start):
+    body = {'road_id': random_road(rng), 'junction_id': f'bench-{rng.randrange(junctions)}'}
+    try:
+        async with session.post(url, json=body) as response:
+            payload = await response.json(content_type=None)
+            if response.status != 200:
+                tally.errors += 1
+                return
+            if not payload.get('success'):
+                tally.rejected += 1
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        tally.errors += 1
+        return
+    # Measured from when the request was due, not when it was sent (no coordinated omission)
+    tally.latencies_ns.append(time.perf_counter_ns() - intended_start)
+
+async def open_loop(url, rate, duration, junctions, seed, timeout):
+    """Poisson arrivals at rate req/s, whether or not earlier requests have finished"""
+    rng = random.Random(seed)
+    tally = Tally()
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        tasks = set()
+        started = time.perf_counter_ns()
+        due = started
+        end = started + int(duration * 1e9)
+        while True:
+            due += int(rng.expovariate(rate) * 1e9)
+            if due >= end:
+                break
+            delay = (due - time.perf_counter_ns()) / 1e9
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.ensure_future(send(session, url, rng, junctions, tally, due))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+    return tally
+
+async def closed_loop(url, concurrency, duration, junctions, seed, timeout):
+    """concurrency clients, each sending its next request as soon as the last one returns"""
+    rng = random.Random(seed)
+    tally = Tally()
+    end = time.perf_counter_ns() + int(duration * 1e9)
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        async def client():
+            while time.perf_counter_ns() < end:
+                await send(session, url, rng, junctions, tally, time.perf_counter_ns())
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+    return tally
+
+def run_worker(mode, url, level, duration, junctions, seed, timeout):
+    """One load process; returns plain data so it can cross the process boundary"""
+    loop_fn = open_loop if mode == 'open' else closed_loop
+    tally = asyncio.run(loop_fn(url, level, duration, junctions, seed, timeout))
+    return tally.latencies_ns, tally.errors, tally.rejected
+
+def run_level(args, mode, level):
+    processes = max(1, args.processes)
+    if mode == 'open':
+        shares = [level / processes] * processes
+    else:
+        shares = [level // processes + (1 if index < level % processes else 0) for index in range(processes)]
+    histogram = Histogram()
+    errors = rejected = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(processes) as pool:
+        futures = [pool.submit(run_worker, mode, args.url + '/api/control_vehicle', share, args.duration,
+                               args.junctions, args.seed + index, args.timeout)
+                   for index, share in enumerate(shares) if share]
+        for future in futures:
+            latencies, worker_errors, worker_rejected = future.result()
+            for latency in latencies:
+                histogram.record(latency)
+            errors += worker_errors
+            rejected += worker_rejected
+    elapsed = time.perf_counter() - started
+    total = histogram.count + errors
+    summary = histogram.summary()
+    return {
+        'mode': mode,
+        'target_rps' if mode == 'open' else 'concurrency': level,
+        'duration_s': round(elapsed, 3),
+        'requests': total,
+        'completed': histogram.count,
+        'throughput_rps': round(histogram.count / elapsed, 1) if elapsed else 0.0,
+        'errors': errors,
+        'error_rate': round(errors / total, 6) if total else 0.0,
+        'rejected': rejected,
+        'latency_ms': {
+            'mean': round(summary['mean_us'] / 1000, 3),
+            'p50': round(summary['p50_us'] / 1000, 3),
+            'p99': round(summary['p99_us'] / 1000, 3),
+            'p999': round(summary['p999_us'] / 1000, 3),
+            'max': round(summary['max_us'] / 1000, 3)
+        }
+    }
+
+def spawn_server(name, port, use_async, extra_env=None):
+    """Start a server script on localhost with a throwaway journal; returns the process"""
+    env = dict(os.environ, TRAFFIC_JOURNAL_DIR=tempfile.mkdtemp(prefix='bench-journal-'), **(extra_env or {}))
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), SERVERS[name]),
+               '--port', str(port)]
+    if use_async:
+        command.append('--async')
+    kwargs = {'start_new_session': True} if os.name == 'posix' else {}
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs)
+
+def stop_server(process):
+    if process.poll() is not None:
+        return
+    if os.name == 'posix':
+        os.killpg(process.pid, signal.SIGTERM)
+    else:
+        process.terminate()
+    process.wait(10)
+
+async def wait_until_up(url, process=None, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode} before accepting requests")
+            try:
+                async with session.get(url + '/api/status') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up within {timeout}s")
+
+def regressions(results, baseline, tolerance):
+    """Levels whose throughput fell or whose p99 rose by more than tolerance versus baseline"""
+    def key(result):
+        return result['mode'], result.get('target_rps', result.get('concurrency'))
+    previous = {key(result): result for result in baseline.get('results', [])}
+    found = []
+    for result in results:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        if result['throughput_rps'] < old['throughput_rps'] * (1 - tolerance):
+            found.append(f"{key(result)} throughput {old['throughput_rps']} -> {result['throughput_rps']} req/s")
+        if result['latency_ms']['p99'] > old['latency_ms']['p99'] * (1 + tolerance):
+            found.append(f"{key(result)} p99 {old['latency_ms']['p99']} -> {result['latency_ms']['p99']} ms")
+        if result['error_rate'] > old['error_rate'] + tolerance / 100:
+            found.append(f"{key(result)} error rate {old['error_rate']} -> {result['error_rate']}")
+    return found
+
+def levels(text, cast):
+    return [cast(value) for value in text.split(',') if value.strip()] if text else []
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test /api/control_vehicle')
+    parser.add_argument('--url', default='http://localhost:5000', help='server to test (ignored with --spawn)')
+    parser.add_argument('--spawn', choices=sorted(SERVERS), help='start this server on --port for the run')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--async', dest='use_async', action='store_true', help='spawn the server in asyncio mode')
+    parser.add_argument('--rates', default='500,1000,2000', help='open-loop Poisson rates, req/s')
+    parser.add_argument('--concurrency', default='1,8,32', help='closed-loop client counts')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per level')
+    parser.add_argument('--junctions', type=int, default=64, help='spread requests over this many junctions')
+    parser.add_argument('--processes', type=int, default=1, help='load-generator processes per level')
+    parser.add_argument('--timeout', type=float, default=10.0, help='per-request timeout, seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help='earlier results JSON; exit 1 if this run regressed')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative regression')
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        args.url = f'http://127.0.0.1:{args.port}'
+        server = spawn_server(args.spawn, args.port, args.use_async)
+    try:
+        asyncio.run(wait_until_up(args.url, server))
+        results = []
+        for mode, values in (('open', levels(args.rates, float)), ('closed', levels(args.concurrency, int))):
+            for level in values:
+                print(f"🏁 {mode}-loop {level:g}{' req/s' if mode == 'open' else ' clients'} for {args.duration:g}s...")
+                result = run_level(args, mode, level)
+                latency = result['latency_ms']
+                print(f"   {result['throughput_rps']} req/s, p50 {latency['p50']} ms, p99 {latency['p99']} ms, "
+                      f"p999 {latency['p999']} ms, errors {result['error_rate']:.2%}")
+                results.append(result)
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    report = {
+        'meta': {
+            'url': args.url,
+            'server': args.spawn,
+            'async': args.use_async,
+            'junctions': args.junctions,
+            'processes': args.processes,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'started': time.strftime('%Y-%m-%d %H:%M:%S')
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"❌ Regression: {line}")
+        if found:
+            sys.exit(1)
+        print("✅ No regressions against baseline")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+# 📡 Dashboard Fan-out Benchmark - thousands of headless Socket.IO subscribers against one server
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import random
+import time
+
+import aiohttp
+import socketio
+from bench_control_rpc import SERVERS, random_road, spawn_server, stop_server, wait_until_up
+from metrics import Histogram
+from state_codec import decode_states
+
+CONNECT_CONCURRENCY = 200  # Handshakes in flight per subscriber process
+
+def raise_fd_limit():
+    """Each subscriber is a socket on both ends; lift the soft limit to the hard one"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+async def subscribe(url, count, binary_share, seed, conn):
+    """Connect count clients, report, record frame latency until told to stop, report again"""
+    rng = random.Random(seed)
+    latency = Histogram()
+    connect_time = Histogram()
+    received = [0]
+    state_changes = [0]
+    clients = []
+    gate = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+
+        async def connect(binary):
+            client = socketio.AsyncClient(reconnection=False, http_session=session)
+
+            @client.on('frame')
+            def on_frame(frame):
+                arrived = time.time_ns()
+                states = frame['states'] if isinstance(frame['states'], list) else decode_states(frame['states'])
+                received[0] += 1
+                state_changes[0] += len(states)
+                if frame.get('committed_ns'):
+                    latency.record(arrived - frame['committed_ns'])
+
+            async with gate:
+                started = time.perf_counter_ns()
+                try:
+                    await client.connect(url, transports=['websocket'], auth={'binary': binary}, wait_timeout=30)
+                except (socketio.exceptions.ConnectionError, aiohttp.ClientError, OSError):
+                    return None
+                connect_time.record(time.perf_counter_ns() - started)
+            return client
+
+        results = await asyncio.gather(*(connect(rng.random() < binary_share) for _ in range(count)))
+        clients = [client for client in results if client is not None]
+        conn.send(('connected', len(clients), count - len(clients), connect_time.state()))
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, conn.recv)  # Parent says stop
+        disconnected = sum(1 for client in clients if not client.connected)
+        await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+    conn.send(('done', received[0], state_changes[0], disconnected, latency.state()))
+
+def run_subscribers(url, count, binary_share, seed, conn):
+    raise_fd_limit()
+    asyncio.run(subscribe(url, count, binary_share, seed, conn))
+
+async def scrape_gauges(session, url):
+    """Every sample on /metrics as {'name{labels}': value}"""
+    async with session.get(url + '/metrics') as response:
+        text = await response.text()
+    values = {}
+    for line in text.splitlines():
+        if line.startswith('#') or ' ' not in line:
+            continue
+        name, value = line.rsplit(' ', 1)
+        values[name] = float(value)
+    return values
+
+async def scrape(url):
+    """Server process gauges from /metrics: (cpu seconds, resident bytes, connected sockets)"""
+    async with aiohttp.ClientSession() as session:
+        values = await scrape_gauges(session, url)
+    sockets = sum(value for name, value in values.items() if name.startswith('traffic_connected_sockets'))
+    return (values.get('traffic_process_cpu_seconds'), values.get('traffic_process_resident_memory_bytes'),
+            int(sockets))
+
+async def drive(url, rate, duration, junctions, seed):
+    """Vehicle switches at rate req/s (Poisson) so every tick has state changes to fan out"""
+    rng = random.Random(seed)
+    sent = failed = 0
+    tasks = set()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+
+        async def post():
+            nonlocal failed
+            body = {'road_id': random_road(rng), 'junction_id': f'fanout-{rng.randrange(junctions)}'}
+            try:
+                async with session.post(url + '/api/control_vehicle', json=body) as response:
+                    await response.read()
+                    failed += response.status != 200
+            except aiohttp.ClientError:
+                failed += 1
+
+        end = time.perf_counter() + duration
+        due = time.perf_counter()
+        while True:
+            due += rng.expovariate(rate)
+            if due >= end:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.ensure_future(post())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            sent += 1
+        if tasks:
+            await asyncio.wait(tasks)
+    return sent, failed
+
+def run_level(args, subscribers):
+    processes = max(1, min(args.processes, subscribers))
+    shares = [subscribers // processes + (1 if index < subscribers % processes else 0) for index in range(processes)]
+    cpu_before, rss_before, _ = asyncio.run(scrape(args.url))
+
+    workers = []
+    for index, share in enumerate(shares):
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=run_subscribers, daemon=True,
+                                          args=(args.url, share, args.binary_share, args.seed + index, child))
+        process.start()
+        workers.append((process, parent))
+
+    connected = failed = 0
+    connect_time = Histogram()
+    for _, parent in workers:
+        _, ok, failures, state = parent.recv()
+        connected += ok
+        failed += failures
+        connect_time.merge(state)
+    time.sleep(args.settle)
+    cpu_idle, rss_connected, server_sockets = asyncio.run(scrape(args.url))
+
+    started = time.perf_counter()
+    sent, rejected = asyncio.run(drive(args.url, args.rate, args.duration, args.junctions, args.seed))
+    cpu_driven, rss_driven, _ = asyncio.run(scrape(args.url))
+    elapsed = time.perf_counter() - started
+    time.sleep(args.settle)  # Let the last frames arrive
+
+    latency = Histogram()
+    frames = state_changes = dropped = 0
+    for process, parent in workers:
+        parent.send('stop')
+        _, received, changes, disconnected, state = parent.recv()
+        frames += received
+        state_changes += changes
+        dropped += disconnected
+        latency.merge(state)
+        process.join(30)
+
+    summary = latency.summary()
+    connect_summary = connect_time.summary()
+    per_subscriber = max(connected, 1)
+    return {
+        'subscribers': subscribers,
+        'connected': connected,
+        'connect_failed': failed,
+        'disconnected_during_run': dropped,
+        'server_sockets': server_sockets,
+        'connect_ms': {'p50': round(connect_summary['p50_us'] / 1000, 3),
+                       'p99': round(connect_summary['p99_us'] / 1000, 3)},
+        'control_requests': sent,
+        'control_failed': rejected,
+        'frames_received': frames,
+        'frames_per_subscriber_per_s': round(frames / per_subscriber / elapsed, 2),
+        'state_changes_received': state_changes,
+        'broadcast_latency_ms': {
+            'mean': round(summary['mean_us'] / 1000, 3),
+            'p50': round(summary['p50_us'] / 1000, 3),
+            'p99': round(summary['p99_us'] / 1000, 3),
+            'p999': round(summary['p999_us'] / 1000, 3),
+            'max': round(summary['max_us'] / 1000, 3)
+        },
+        'server': {
+            'rss_idle_mb': round(rss_before / 2**20, 1) if rss_before else None,
+            'rss_connected_mb': round(rss_connected / 2**20, 1) if rss_connected else None,
+            'rss_driven_mb': round(rss_driven / 2**20, 1) if rss_driven else None,
+            'memory_per_subscriber_kb': round((rss_connected - rss_before) / per_subscriber / 1024, 2)
+                                        if rss_before and rss_connected else None,
+            'cpu_percent_driven': round((cpu_driven - cpu_idle) / elapsed * 100, 1),
+            'cpu_ms_per_subscriber_per_s': round((cpu_driven - cpu_idle) * 1000 / elapsed / per_subscriber, 4)
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure Socket.IO frame fan-out to many dashboards')
+    parser.add_argument('--url', default='http://localhost:5000', help='server to test (ignored with --spawn)')
+    parser.add_argument('--spawn', choices=sorted(SERVERS), help='start this server on --port for the run')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--async', dest='use_async', action='store_true', help='spawn the server in asyncio mode')
+    parser.add_argument('--subscribers', default='1000,5000,20000', help='subscriber counts, one level each')
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(),
+                        help='subscriber processes (clients are split between them)')
+    parser.add_argument('--binary-share', type=float, default=0.0, help='fraction of clients using binary frames')
+    parser.add_argument('--rate', type=float, default=50.0, help='vehicle switches per second while measuring')
+    parser.add_argument('--junctions', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of state changes per level')
+    parser.add_argument('--settle', type=float, default=2.0, help='pause after connecting and after driving')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='bench_fanout.json')
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    server = None
+    if args.spawn:
+        args.url = f'http://127.0.0.1:{args.port}'
+        server = spawn_server(args.spawn, args.port, args.use_async)
+    try:
+        asyncio.run(wait_until_up(args.url, server))
+        results = []
+        for subscribers in [int(value) for value in args.subscribers.split(',') if value.strip()]:
+            print(f"📡 {subscribers} subscribers, {args.rate:g} switches/s for {args.duration:g}s...")
+            result = run_level(args, subscribers)
+            latency, server_use = result['broadcast_latency_ms'], result['server']
+            print(f"   {result['connected']} connected, p50 {latency['p50']} ms, p99 {latency['p99']} ms, "
+                  f"p999 {latency['p999']} ms, server CPU {server_use['cpu_percent_driven']}%, "
+                  f"{server_use['memory_per_subscriber_kb']} KiB/subscriber")
+            results.append(result)
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    report = {
+        'meta': {
+            'url': args.url,
+            'server': args.spawn,
+            'async': args.use_async,
+            'processes': args.processes,
+            'binary_share': args.binary_share,
+            'rate': args.rate,
+            'junctions': args.junctions,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'started': time.strftime('%Y-%m-%d %H:%M:%S')
+        },
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"📄 Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# 📡 Broadcast Coalescer - one Socket.IO frame per tick instead of one emit per change
+
+import threading
+import time
+from metrics import Histogram
+from state_codec import encode_states
+
+DEFAULT_TICK_MS = 30
+
+# Subscribers join one of these on connect; each frame is encoded once per room
+JSON_ROOM = 'frames'
+BINARY_ROOM = 'frames-binary'
+
+def frame_room(auth):
+    """Room for a connecting client; it opts into packed binary states with auth {binary: true}"""
+    return BINARY_ROOM if isinstance(auth, dict) and auth.get('binary') else JSON_ROOM
+
+class BroadcastCoalescer:
+    """Collects state changes and log entries and flushes them as one 'frame' event per tick.
+
+    Within a tick only the latest snapshot per junction is kept, log entries are
+    concatenated, and the newest stats win. A tick with nothing published sends
+    nothing. Each frame goes out in a single broadcast emit, so it is encoded
+    once for every subscriber in a room. The binary room gets the same frame with
+    states packed by state_codec, a batch of junctions in one attachment.
+    committed_ns is the wall-clock time the oldest state change in the frame was
+    committed on its junction (None for a frame with no state), so a subscriber
+    on the same host can measure change-to-receipt latency including the time
+    spent in the publisher queue. log_epoch tags every frame with the log ring
+    its sequence numbers come from.
+    """
+
+    def __init__(self, emit, tick_ms=DEFAULT_TICK_MS, log_epoch=None):
+        self._emit = emit
+        self.log_epoch = log_epoch
+        self.tick = tick_ms / 1000.0
+        self._lock = threading.Lock()
+        self._states = {}
+        self._logs = []
+        self._reset = False
+        self._stats = None
+        self.events_published = 0
+        self.frames_sent = 0
+        self._first_published = None
+        self._oldest_committed_ns = None
+        self.frame_delay = Histogram()   # First change in a tick -> its frame emitted
+        self.emit_latency = {JSON_ROOM: Histogram(), BINARY_ROOM: Histogram()}  # One emit per room
+        self._thread = threading.Thread(target=self._run, name='broadcast-coalescer', daemon=True)
+        self._thread.start()
+
+    def publish_state(self, snapshot, committed_ns=None):
+        """Queue a junction snapshot; a newer one for the same junction in this tick replaces it.
+
+        committed_ns is when Junction.commit() made the change; the frame keeps the oldest.
+        """
+        with self._lock:
+            self._states[snapshot['junction_id']] = snapshot
+            if committed_ns is not None and (self._oldest_committed_ns is None
+                                             or committed_ns < self._oldest_committed_ns):
+                self._oldest_committed_ns = committed_ns
+            self._mark_published()
+
+    def publish_logs(self, logs, stats, reset=False):
+        """Queue new log entries (and current stats); reset drops what was queued before"""
+        with self._lock:
+            if reset:
+                self._logs = []
+                self._reset = True
+            self._logs.extend(logs)
+            self._stats = stats
+            self._mark_published()
+
+    def _mark_published(self):
+        """Count an event and remember when the tick's first change arrived (call with lock held)"""
+        self.events_published += 1
+        if self._first_published is None:
+            self._first_published = time.perf_counter_ns()
+
+    def flush(self):
+        with self._lock:
+            if not self._states and self._stats is None:
+                return None
+            frame = {
+                'states': list(self._states.values()),
+                'logs': self._logs,
+                'reset': self._reset,
+                'log_epoch': self.log_epoch,
+                'stats': self._stats,
+                'committed_ns': self._oldest_committed_ns
+            }
+            self._states = {}
+            self._logs = []
+            self._reset = False
+            self._stats = None
+            self._oldest_committed_ns = None
+            self.frames_sent += 1
+            first_published, self._first_published = self._first_published, None
+        self._timed_emit(frame, JSON_ROOM)
+        self._timed_emit(dict(frame, states=encode_states(frame['states'])), BINARY_ROOM)
+        self.frame_delay.record(time.perf_counter_ns() - first_published)
+        return frame
+
+    def _timed_emit(self, frame, room):
+        started = time.perf_counter_ns()
+        self._emit('frame', frame, room)
+        self.emit_latency[room].record(time.perf_counter_ns() - started)
+
+    def stats(self):
+        return {
+            'tick_ms': round(self.tick * 1000, 3),
+            'events_published': self.events_published,
+            'frames_sent': self.frames_sent,
+            'frames_saved': self.events_published - self.frames_sent
+        }
+
+    def _run(self):
+        while True:
+            time.sleep(self.tick)
+            try:
+                self.flush()
+            except Exception as exc:
+                print(f"❌ Broadcast failed: {exc}")
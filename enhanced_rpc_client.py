@@ -1,6 +1,8 @@
-from flask import Flask, render_template_string
+from flask import Flask, Response, request, render_template_string
 import datetime
 
+from static_pages import StaticPages, SOCKETIO_CLIENT_PATH
+
 app = Flask(__name__)
 
 # Enhanced Client HTML with Logging
@@ -9,7 +11,7 @@ CLIENT_HTML = """
 <html>
 <head>
     <title>🎮 Enhanced Traffic Control Client</title>
-    <script src="https://cdn.socket.io/4.5.4/socket.io.min.js"></script>
+    <script src="/vendor/socket.io-4.8.1.min.js"></script>
     <style>
         * { margin: 0; padding: 0; box-sizing: border-box; }
         body { 
@@ -230,6 +232,7 @@ CLIENT_HTML = """
 
     <script>
         const socket = io("http://localhost:5000");
+        const JUNCTION_ID = new URLSearchParams(window.location.search).get('junction_id') || 'main';
         let clientLogs = [];
         let clientStats = {
             requestsSent: 0,
@@ -303,7 +306,9 @@ CLIENT_HTML = """
             addClientLog('error', 'Disconnected from server', 'WebSocket connection lost');
         });
 
-        socket.on("update", data => {
+        socket.on("frame", frame => {
+            const data = frame.states.find(state => state.junction_id === JUNCTION_ID);
+            if (!data) return;
             document.getElementById("road1-status").textContent = data.road1;
             document.getElementById("road2-status").textContent = data.road2;
             document.getElementById("ped1-status").textContent = data.pedestrian1;
@@ -323,7 +328,7 @@ CLIENT_HTML = """
                 const response = await fetch("http://localhost:5000/api/control_vehicle", {
                     method: "POST",
                     headers: { "Content-Type": "application/json" },
-                    body: JSON.stringify({ road_id: roadId })
+                    body: JSON.stringify({ road_id: roadId, junction_id: JUNCTION_ID })
                 });
                 
                 const result = await response.json();
@@ -357,7 +362,7 @@ CLIENT_HTML = """
                 const response = await fetch("http://localhost:5000/api/control_pedestrian", {
                     method: "POST",
                     headers: { "Content-Type": "application/json" },
-                    body: JSON.stringify({ crossing_id: crossingId })
+                    body: JSON.stringify({ crossing_id: crossingId, junction_id: JUNCTION_ID })
                 });
                 
                 const result = await response.json();
@@ -389,9 +394,22 @@ CLIENT_HTML = """
 </html>
 """
 
+pages = StaticPages()
+with app.app_context():
+    pages.add('/', render_template_string(CLIENT_HTML))
+pages.add_socketio_client()
+
+def serve_page(path):
+    status, headers, body = pages.respond(path, request.headers)
+    return Response(body, status, headers)
+
 @app.route('/')
 def home():
-    return render_template_string(CLIENT_HTML)
+    return serve_page('/')
+
+@app.route(SOCKETIO_CLIENT_PATH)
+def socketio_client():
+    return serve_page(SOCKETIO_CLIENT_PATH)
 
 if __name__ == '__main__':
     print("🎮 Enhanced Client running at http://localhost:5001")
@@ -1,173 +1,48 @@
 # 🚦 Enhanced Traffic Server with Logging
 
-from flask import Flask, jsonify, request, render_template_string
-import threading
-import time
-import datetime
-from flask_socketio import SocketIO, emit
-from flask_cors import CORS
+from phase_engine import VEHICLE, CROSSING
+from phase_plans import ENHANCED_PLAN
+from sharded_stats import ShardedCounters
+from traffic_service import TrafficService
 
-app = Flask(__name__)
-CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Request counters - sharded per thread, so incrementing never takes a shared lock
+request_counters = ShardedCounters([
+    'total_requests',
+    'successful_requests',
+    'failed_requests',
+    'vehicle_requests',
+    'pedestrian_requests'
+])
 
-# Traffic state
-traffic_state = {
-    'road1': 'RED',
-    'road2': 'GREEN',
-    'pedestrian1': 'RED',
-    'pedestrian2': 'RED'
-}
-
-# Logging system
-log_entries = []
-system_stats = {
-    'total_requests': 0,
-    'successful_requests': 0,
-    'failed_requests': 0,
-    'vehicle_requests': 0,
-    'pedestrian_requests': 0,
-    'server_start_time': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-}
-
-lock = threading.Lock()
-
-def add_log(log_type, action, message, success=True):
-    """Add a log entry with timestamp and details"""
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = {
-        'timestamp': timestamp,
-        'type': log_type,
-        'action': action,
-        'message': message,
-        'success': success,
-        'status': '✅ SUCCESS' if success else '❌ ERROR'
-    }
-    
-    log_entries.append(log_entry)
-    if len(log_entries) > 100:  # Keep only last 100 logs
-        log_entries.pop(0)
-    
-    # Update stats
-    system_stats['total_requests'] += 1
-    if success:
-        system_stats['successful_requests'] += 1
-    else:
-        system_stats['failed_requests'] += 1
-    
-    if log_type == 'VEHICLE':
-        system_stats['vehicle_requests'] += 1
-    elif log_type == 'PEDESTRIAN':
-        system_stats['pedestrian_requests'] += 1
-    
-    # Emit log update to dashboard
-    socketio.emit('log_update', {
-        'logs': log_entries[-10:],  # Send last 10 logs
-        'stats': system_stats
-    })
-
-@app.route('/api/control_pedestrian', methods=['POST'])
-def control_pedestrian():
-    data = request.get_json()
-    crossing_id = data.get('crossing_id')
-    road_id = crossing_id
-
-    with lock:
-        if traffic_state[f'road{road_id}'] == 'GREEN':
-            error_msg = f"Cannot cross - Road {road_id} is GREEN for vehicles"
-            add_log('PEDESTRIAN', f'Crossing {crossing_id}', error_msg, success=False)
-            print(f"❌ Pedestrian crossing {crossing_id} denied: {error_msg}")
-            return jsonify({"success": False, "message": error_msg})
-
-    def crossing_sequence():
-        with lock:
-            traffic_state[f'pedestrian{crossing_id}'] = 'GREEN'
-            socketio.emit('update', traffic_state)
-            add_log('PEDESTRIAN', f'Crossing {crossing_id}', f'Pedestrian crossing {crossing_id} started (8 seconds)', success=True)
-            print(f"🚶 Pedestrian crossing {crossing_id} started - GREEN for 8 seconds")
-        
-        time.sleep(8)
+def count_log_entries(records):
+    """Update stats on the calling thread's counter shard"""
+    for log_type, _, _, success, _, _ in records:
+        request_counters.incr('total_requests')
+        if success:
+            request_counters.incr('successful_requests')
+        else:
+            request_counters.incr('failed_requests')
         
-        with lock:
-            traffic_state[f'pedestrian{crossing_id}'] = 'RED'
-            socketio.emit('update', traffic_state)
-            add_log('PEDESTRIAN', f'Crossing {crossing_id}', f'Pedestrian crossing {crossing_id} completed', success=True)
-            print(f"🛑 Pedestrian crossing {crossing_id} completed - back to RED")
+        if log_type == 'VEHICLE':
+            request_counters.incr('vehicle_requests')
+        elif log_type == 'PEDESTRIAN':
+            request_counters.incr('pedestrian_requests')
 
-    threading.Thread(target=crossing_sequence, daemon=True).start()
-    success_msg = f"Pedestrian crossing {crossing_id} initiated successfully"
-    return jsonify({"success": True, "message": success_msg})
+service = TrafficService(__name__, 'enhanced', ENHANCED_PLAN, request_counters, count_logs=count_log_entries)
+app = service.app
+socketio = service.socketio
+add_log = service.add_log
 
-@app.route('/api/control_vehicle', methods=['POST'])
-def control_vehicle():
-    data = request.get_json()
-    road_id = data.get('road_id')
+# Commands - called with the junction lock held, by the single-command routes and by /api/rpc
 
-    with lock:
-        if traffic_state[f'road{road_id}'] == 'GREEN':
-            error_msg = f"Road {road_id} is already GREEN"
-            add_log('VEHICLE', f'Switch to Road {road_id}', error_msg, success=False)
-            print(f"❌ Vehicle request denied: {error_msg}")
-            return jsonify({"success": False, "message": error_msg})
+def start_pedestrian_crossing(junction, params, log=add_log):
+    return service.engine.start(junction, CROSSING, params.get('crossing_id'), log)
 
-    def vehicle_sequence():
-        other_road_id = 2 if road_id == 1 else 1
-        
-        # Step 1: Other road to YELLOW
-        with lock:
-            traffic_state[f'road{other_road_id}'] = 'YELLOW'
-            traffic_state[f'road{road_id}'] = 'RED'
-            socketio.emit('update', traffic_state)
-            add_log('VEHICLE', f'Switch to Road {road_id}', f'Road {other_road_id} changed to YELLOW (warning phase)', success=True)
-            print(f"🟡 Road {other_road_id} → YELLOW (3 second warning)")
-        
-        time.sleep(3)
-        
-        # Step 2: Other road to RED  
-        with lock:
-            traffic_state[f'road{other_road_id}'] = 'RED'
-            socketio.emit('update', traffic_state)
-            add_log('VEHICLE', f'Switch to Road {road_id}', f'Road {other_road_id} changed to RED (clearance phase)', success=True)
-            print(f"🔴 Road {other_road_id} → RED (2 second clearance)")
-        
-        time.sleep(2)
-        
-        # Step 3: Target road to GREEN
-        with lock:
-            traffic_state[f'road{road_id}'] = 'GREEN'
-            socketio.emit('update', traffic_state)
-            add_log('VEHICLE', f'Switch to Road {road_id}', f'Road {road_id} changed to GREEN (go phase)', success=True)
-            print(f"🟢 Road {road_id} → GREEN (vehicles can proceed)")
-
-    threading.Thread(target=vehicle_sequence, daemon=True).start()
-    success_msg = f"Traffic switch to Road {road_id} initiated successfully"
-    add_log('VEHICLE', f'Switch to Road {road_id}', 'Traffic switch sequence started', success=True)
-    return jsonify({"success": True, "message": success_msg})
-
-@app.route('/api/status')
-def get_status():
-    with lock:
-        return jsonify({
-            'traffic_state': traffic_state,
-            'logs': log_entries[-10:],  # Last 10 logs
-            'stats': system_stats
-        })
-
-@app.route('/api/logs')
-def get_logs():
-    """Get all logs"""
-    return jsonify({
-        'logs': log_entries,
-        'stats': system_stats
-    })
+def start_vehicle_switch(junction, params, log=add_log):
+    return service.engine.start(junction, VEHICLE, params.get('road_id'), log)
 
-@app.route('/api/clear_logs', methods=['POST'])
-def clear_logs():
-    """Clear all logs"""
-    global log_entries
-    log_entries = []
-    add_log('SYSTEM', 'Clear Logs', 'All logs cleared by user', success=True)
-    return jsonify({"success": True, "message": "Logs cleared successfully"})
+control_pedestrian_rpc = service.command('control_pedestrian', start_pedestrian_crossing)
+control_vehicle_rpc = service.command('control_vehicle', start_vehicle_switch)
 
 # Enhanced Dashboard with Logs
 ENHANCED_DASHBOARD_HTML = """
@@ -176,7 +51,7 @@ ENHANCED_DASHBOARD_HTML = """
 <head>
     <title>🚦 Enhanced Traffic Control Dashboard</title>
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.0.0/socket.io.js"></script>
+    <script src="/vendor/socket.io-4.8.1.min.js"></script>
     <style>
         * { margin: 0; padding: 0; box-sizing: border-box; }
         body { 
@@ -365,9 +240,38 @@ ENHANCED_DASHBOARD_HTML = """
     </div>
 
     <script>
-        const socket = io();
+        // Packed binary states (state_codec.py) unless the page is opened with ?binary=0
+        const BINARY_FRAMES = new URLSearchParams(window.location.search).get('binary') !== '0';
+        const socket = io({ auth: { binary: BINARY_FRAMES } });
+        
+        const SIGNALS = ['road1', 'road2', 'pedestrian1', 'pedestrian2'];
+        const COLOURS = ['RED', 'YELLOW', 'GREEN'];
+        const utf8 = new TextDecoder();
+        
+        function decodeStates(data) {
+            const bytes = data instanceof ArrayBuffer ? new Uint8Array(data) : data;
+            const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+            const count = view.getUint16(1, true);  // Byte 0 is the format version
+            let offset = 3;
+            const states = [];
+            for (let i = 0; i < count; i++) {
+                const idLength = view.getUint16(offset, true);
+                const state = { junction_id: utf8.decode(bytes.subarray(offset + 2, offset + 2 + idLength)) };
+                offset += 2 + idLength;
+                state.version = view.getUint32(offset, true);
+                const packed = view.getUint8(offset + 4);
+                offset += 5;
+                SIGNALS.forEach((signal, index) => { state[signal] = COLOURS[(packed >> (2 * index)) & 3]; });
+                states.push(state);
+            }
+            return states;
+        }
+        const JUNCTION_ID = new URLSearchParams(window.location.search).get('junction_id') || 'main';
         
         function updateTrafficLights(state) {
+            if (!state) return;  // Unknown junction: nothing to show until a command creates it
+            stateVersion = state.version;
+            
             // Reset all lights
             document.querySelectorAll('.light').forEach(light => {
                 light.classList.remove('red', 'yellow', 'green');
@@ -444,40 +348,100 @@ ENHANCED_DASHBOARD_HTML = """
         
         async function fetchStatus() {
             try {
-                const response = await fetch('/api/status');
+                const response = await fetch(`/api/status?junction_id=${encodeURIComponent(JUNCTION_ID)}`);
+                if (!response.ok) return;
                 const data = await response.json();
                 updateTrafficLights(data.traffic_state);
                 updateStats(data.stats);
-                updateLogs(data.logs);
+                applyLogDelta({ logs: data.logs, reset: true });
             } catch (error) {
                 console.error('Error fetching status:', error);
             }
         }
         
+        // Long-poll fallback while the socket is down: the server answers as soon as the
+        // junction version moves past ours, or with an empty 304 after 25 seconds
+        let stateVersion = 0;
+        let longPolling = false;
+        
+        async function longPoll() {
+            if (longPolling) return;
+            longPolling = true;
+            while (!socket.connected) {
+                try {
+                    const response = await fetch(`/api/status?junction_id=${encodeURIComponent(JUNCTION_ID)}&since=${stateVersion}&timeout=25`);
+                    if (response.status === 200) {
+                        const data = await response.json();
+                        updateTrafficLights(data.traffic_state);
+                        updateStats(data.stats);
+                        applyLogDelta({ logs: data.logs, reset: true });
+                    } else if (response.status !== 304) {
+                        await new Promise(resolve => setTimeout(resolve, 2000));  // e.g. 404: back off
+                    }
+                } catch (error) {
+                    await new Promise(resolve => setTimeout(resolve, 2000));
+                }
+            }
+            longPolling = false;
+        }
+        
+        // Log deltas - the server only sends entries we have not seen, keyed by seq
+        let logBuffer = [];
+        let lastSeq = 0;
+        let logEpoch = null;  // Seqs start over when the server restarts; a new epoch means start over too
+        
+        function applyLogDelta(data) {
+            const restarted = data.log_epoch !== undefined && logEpoch !== null && data.log_epoch !== logEpoch;
+            if (data.log_epoch !== undefined) logEpoch = data.log_epoch;
+            const reset = data.reset || restarted;
+            const fresh = reset ? data.logs : data.logs.filter(log => log.seq > lastSeq);
+            if (reset) {
+                logBuffer = [];
+                lastSeq = 0;
+            }
+            if (fresh.length === 0 && !reset) return;
+            logBuffer = logBuffer.concat(fresh).slice(-10);
+            if (fresh.length > 0) lastSeq = fresh[fresh.length - 1].seq;
+            updateLogs(logBuffer);
+        }
+        
+        function resume() {
+            socket.emit('resume', { last_seq: lastSeq, log_epoch: logEpoch, junction_id: JUNCTION_ID }, function(data) {
+                if (data.success === false) return;  // Unknown junction; frames bring it once it exists
+                updateTrafficLights(data.traffic_state);
+                updateStats(data.stats);
+                applyLogDelta(data);
+                if (data.more) resume();
+            });
+        }
+        
         // Socket.IO real-time updates
-        socket.on('update', function(state) {
-            updateTrafficLights(state);
-        });
+        socket.on('connect', resume);  // Also fires on reconnect: fetch only what we missed
+        socket.on('disconnect', longPoll);
+        socket.on('connect_error', longPoll);
         
-        socket.on('log_update', function(data) {
-            updateStats(data.stats);
-            updateLogs(data.logs);
+        // One frame per server tick: latest state per junction plus the new log entries
+        socket.on('frame', function(frame) {
+            const states = Array.isArray(frame.states) ? frame.states : decodeStates(frame.states);
+            states.forEach(function(state) {
+                if (state.junction_id === JUNCTION_ID) updateTrafficLights(state);
+            });
+            if (frame.stats) {
+                updateStats(frame.stats);
+                applyLogDelta(frame);
+            }
         });
         
-        // Initial load and periodic refresh
+        // Initial load; after that the socket keeps us current
         fetchStatus();
-        setInterval(fetchStatus, 5000);
     </script>
 </body>
 </html>
 """
 
-@app.route('/')
-def dashboard():
-    return render_template_string(ENHANCED_DASHBOARD_HTML)
+service.add_dashboard(ENHANCED_DASHBOARD_HTML)
 
 if __name__ == '__main__':
-    add_log('SYSTEM', 'Server Start', 'Enhanced traffic server started successfully', success=True)
-    print("🚦 Enhanced Traffic Server with Logging running at http://localhost:5000")
-    print("📊 Dashboard includes real-time logs and statistics")
-    socketio.run(app, debug=True, port=5000,host= '0.0.0.0')
+    service.main('Enhanced traffic server', 'Enhanced traffic server started successfully',
+                 "🚦 Enhanced Traffic Server with Logging running at http://localhost:{port}",
+                 "📊 Dashboard includes real-time logs and statistics")
@@ -0,0 +1,266 @@
+# 📼 Event Journal - append-only, fixed-size binary records in memory-mapped segment files
+
+import mmap
+import os
+import struct
+import threading
+import time
+from log_store import format_timestamp
+from state_codec import pack_signals, unpack_signals
+
+try:
+    import fcntl
+except ImportError:  # Windows: lock a file inside the directory instead
+    fcntl = None
+    import msvcrt
+
+JUNCTION_ID_BYTES = 32  # Longest junction id a record can hold; the registry refuses longer ones
+RECORD = struct.Struct(f'<QqBBBxI12s{JUNCTION_ID_BYTES}s48s140s')  # 256 bytes
+RECORD_SIZE = RECORD.size
+SEGMENT_RECORDS = 65536  # 16 MiB per segment file
+DEFAULT_FSYNC_MS = 50
+LOCK_FILE = 'journal.lock'
+
+KIND_LOG = 0
+KIND_STATE = 1
+KIND_NAMES = ('log', 'state')
+
+def fixed(text, size):
+    """UTF-8 encode, cut to size bytes on a character boundary"""
+    data = text.encode('utf-8')
+    if len(data) <= size:
+        return data
+    return data[:size].decode('utf-8', 'ignore').encode('utf-8')
+
+def text(field):
+    return field.rstrip(b'\0').decode('utf-8')
+
+class EventJournal:
+    """Every log record and state transition, persisted as 256-byte records.
+
+    Records are numbered from 1 and never rewritten; record seq lives in segment
+    (seq - 1) // segment_records at a fixed offset, so a lookup is arithmetic.
+    Segment files are preallocated (sparse) and mapped read-only, so readers
+    decode only the records they return. Timestamps are clamped to never go
+    backwards, so seq order is also time order. Appends go straight to the page cache;
+    a background thread fsyncs whatever was appended each interval (group
+    commit), so a burst of events costs one fsync, not one per event.
+    One process at a time owns a journal directory: a second writer would
+    reuse the same seqs, so opening a directory that is in use fails at once.
+    Log types, actions and messages are cut to their field sizes; junction ids
+    are never cut, an id that does not fit is an error.
+    """
+
+    def __init__(self, directory, fsync_ms=DEFAULT_FSYNC_MS, segment_records=SEGMENT_RECORDS, clock=time.time_ns):
+        self.directory = directory
+        self.clock = clock  # ns timestamps for state records and unstamped logs
+        self.segment_records = segment_records
+        self.interval = fsync_ms / 1000.0
+        os.makedirs(directory, exist_ok=True)
+        self._directory_fd = self._lock_directory()
+        self._closed = False
+        self._lock = threading.Lock()       # Appends
+        self._map_lock = threading.Lock()   # Segment mappings
+        self._fds = {}
+        self._maps = {}
+        self._dirty = set()
+        self.listeners = []  # Called with (seq, ts_ns, log_type, action, success) per append
+        self.last_seq = self._recover()
+        self._last_ts = self._fields(self.last_seq)[1] if self.last_seq else 0
+        self.synced_seq = self.last_seq
+        self.fsyncs = 0
+        self._thread = threading.Thread(target=self._run, name='journal-sync', daemon=True)
+        self._thread.start()
+
+    def _lock_directory(self):
+        """Exclusive, non-blocking lock held until close() or process exit"""
+        if fcntl is not None:
+            fd = os.open(self.directory, os.O_RDONLY)
+        else:
+            fd = os.open(os.path.join(self.directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            raise RuntimeError(f"Journal {self.directory} is in use by another process") from None
+        return fd
+
+    def _path(self, index):
+        return os.path.join(self.directory, f'segment-{index:08d}.journal')
+
+    def _recover(self):
+        """Last complete record: binary search the newest segment for the end of the written run"""
+        indexes = sorted(int(name[8:16]) for name in os.listdir(self.directory)
+                         if name.startswith('segment-') and name.endswith('.journal'))
+        if not indexes:
+            return 0
+        index = indexes[-1]
+        base = index * self.segment_records
+        self._open(index)  # Completes the preallocation if a crash interrupted it
+        segment = self._segment(index)
+        low, high = 0, self.segment_records
+        while low < high:
+            middle = (low + high) // 2
+            if struct.unpack_from('<Q', segment, middle * RECORD_SIZE)[0] == base + middle + 1:
+                low = middle + 1
+            else:
+                high = middle
+        return base + low
+
+    def _open(self, index):
+        fd = self._fds.get(index)
+        if fd is None:
+            flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+            fd = os.open(self._path(index), flags, 0o644)
+            if os.fstat(fd).st_size < self.segment_records * RECORD_SIZE:
+                os.ftruncate(fd, self.segment_records * RECORD_SIZE)
+            self._fds[index] = fd
+        return fd
+
+    def _segment(self, index):
+        segment = self._maps.get(index)
+        if segment is None:
+            with self._map_lock:
+                segment = self._maps.get(index)
+                if segment is None:
+                    with open(self._path(index), 'rb') as f:
+                        segment = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._maps[index] = segment
+        return segment
+
+    def append_logs(self, records):
+        """Journal (log_type, action, message, success, junction_id, ts_ns) records"""
+        return self._append([
+            (KIND_LOG, ts_ns or self.clock(), log_type, action, message, success, junction_id, 0, 0)
+            for log_type, action, message, success, junction_id, ts_ns in records
+        ])
+
+    def append_state(self, snapshot):
+        """Journal a junction state transition"""
+        return self._append([(KIND_STATE, self.clock(), 'STATE', '', '', True,
+                              snapshot['junction_id'], snapshot['version'], pack_signals(snapshot))])
+
+    def _append(self, events):
+        with self._lock:
+            seq = self.last_seq
+            chunk = bytearray()
+            chunk_start = seq + 1
+            appended = []
+            for kind, ts_ns, log_type, action, message, success, junction_id, version, signals in events:
+                seq += 1
+                ts_ns = self._last_ts = max(ts_ns, self._last_ts)
+                log_type, action = fixed(log_type, 12), fixed(action, 48)
+                junction = (junction_id or '').encode('utf-8')
+                if len(junction) > JUNCTION_ID_BYTES:
+                    raise ValueError(f"Junction id {junction_id!r} is longer than {JUNCTION_ID_BYTES} bytes")
+                chunk += RECORD.pack(seq, ts_ns, kind, 1 if success else 0, signals, version,
+                                     log_type, junction, action, fixed(message, 140))
+                appended.append((seq, ts_ns, log_type.decode('utf-8'), action.decode('utf-8'), bool(success)))
+                if seq % self.segment_records == 0:  # Segment full
+                    self._write(chunk_start, chunk)
+                    chunk, chunk_start = bytearray(), seq + 1
+            if chunk:
+                self._write(chunk_start, chunk)
+            self.last_seq = seq
+            for listener in self.listeners:
+                for event in appended:
+                    listener(*event)
+            return seq
+
+    def subscribe(self, listener):
+        """Replay every journaled event to listener, then call it for each new one"""
+        with self._lock:
+            for seq in range(1, self.last_seq + 1):
+                listener(*self._fields(seq))
+            self.listeners.append(listener)
+
+    def _fields(self, seq):
+        """(seq, ts_ns, log_type, action, success) without building a full entry"""
+        index, slot = divmod(seq - 1, self.segment_records)
+        record = RECORD.unpack_from(self._segment(index), slot * RECORD_SIZE)
+        return record[0], record[1], text(record[6]), text(record[8]), bool(record[3])
+
+    def _write(self, first_seq, data):
+        index, slot = divmod(first_seq - 1, self.segment_records)
+        fd = self._open(index)
+        os.lseek(fd, slot * RECORD_SIZE, os.SEEK_SET)
+        os.write(fd, data)
+        self._dirty.add(index)
+
+    def sync(self):
+        """Group commit: one fsync per dirty segment covers everything appended so far"""
+        with self._lock:
+            if self._closed or self.synced_seq == self.last_seq:
+                return
+            target = self.last_seq
+            dirty, self._dirty = self._dirty, set()
+            fds = [(index, self._fds[index]) for index in dirty]
+            active = (target - 1) // self.segment_records if target else 0
+        for index, fd in fds:
+            os.fsync(fd)
+        with self._lock:
+            for index, fd in fds:
+                if index < active and index not in self._dirty:
+                    os.close(self._fds.pop(index))  # Full segments are never written again
+        self.synced_seq = target
+        self.fsyncs += 1
+
+    def close(self):
+        """Sync, release the segment files and unlock the directory"""
+        self.sync()
+        with self._lock, self._map_lock:
+            self._closed = True
+            for fd in self._fds.values():
+                os.close(fd)
+            for segment in self._maps.values():
+                segment.close()
+            self._fds.clear()
+            self._maps.clear()
+            os.close(self._directory_fd)
+
+    def entry(self, seq):
+        index, slot = divmod(seq - 1, self.segment_records)
+        (seq, ts_ns, kind, success, signals, version, log_type, junction_id,
+         action, message) = RECORD.unpack_from(self._segment(index), slot * RECORD_SIZE)
+        entry = {
+            'seq': seq,
+            'timestamp': format_timestamp(ts_ns // 1_000_000_000),
+            'ts_ns': ts_ns,
+            'kind': KIND_NAMES[kind],
+            'type': text(log_type),
+            'junction_id': text(junction_id) or None
+        }
+        if kind == KIND_STATE:
+            entry['version'] = version
+            entry['signals'] = unpack_signals(signals)
+        else:
+            entry['action'] = text(action)
+            entry['message'] = text(message)
+            entry['success'] = bool(success)
+            entry['status'] = '✅ SUCCESS' if success else '❌ ERROR'
+        return entry
+
+    def page(self, after_seq, limit):
+        """Up to limit entries with seq > after_seq, oldest first"""
+        stop = min(self.last_seq, max(after_seq, 0) + limit)
+        return [self.entry(seq) for seq in range(max(after_seq, 0) + 1, stop + 1)]
+
+    def stats(self):
+        return {
+            'last_seq': self.last_seq,
+            'synced_seq': self.synced_seq,
+            'segments': (self.last_seq - 1) // self.segment_records + 1 if self.last_seq else 0,
+            'fsync_ms': round(self.interval * 1000, 3),
+            'fsyncs': self.fsyncs
+        }
+
+    def _run(self):
+        while not self._closed:
+            time.sleep(self.interval)
+            try:
+                self.sync()
+            except Exception as exc:
+                print(f"❌ Journal sync failed: {exc}")
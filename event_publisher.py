@@ -0,0 +1,47 @@
+# 📤 Event Publisher - outbound queue drained by one dedicated thread
+
+import queue
+import threading
+import traceback
+
+class EventPublisher:
+    """Runs slow side effects (socket broadcasts, log storage, stdout) off the lock.
+
+    Critical sections only post (kind, args) items built from immutable
+    snapshots; the publisher thread hands them to the handler registered for
+    that kind, in the order they were posted.
+    """
+
+    def __init__(self, handlers):
+        self._handlers = handlers
+        self._queue = queue.SimpleQueue()
+        self.processed = 0
+        self._thread = threading.Thread(target=self._run, name='event-publisher', daemon=True)
+        self._thread.start()
+
+    def post(self, kind, *args):
+        self._queue.put((kind, args))
+
+    def drain(self):
+        """Block until everything posted so far has been handled"""
+        done = threading.Event()
+        self._queue.put((None, (done,)))
+        done.wait()
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize(),
+            'processed': self.processed
+        }
+
+    def _run(self):
+        while True:
+            kind, args = self._queue.get()
+            if kind is None:  # drain() marker
+                args[0].set()
+                continue
+            try:
+                self._handlers[kind](*args)
+            except Exception:
+                traceback.print_exc()
+            self.processed += 1
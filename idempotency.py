@@ -0,0 +1,116 @@
+# 🔁 Idempotency - replay the first response to a retried control command
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from request_errors import RequestError, UNPROCESSABLE
+
+HEADER = 'Idempotency-Key'
+FIELD = 'idempotency_key'  # Where the web layers put the header; clients may also send it in the body
+DEFAULT_TTL_S = 600
+DEFAULT_CAPACITY = 10000
+
+def with_idempotency_key(data, headers):
+    """Copy the Idempotency-Key header into a request body dict"""
+    key = headers.get(HEADER)
+    if key and isinstance(data, dict):
+        data = dict(data)
+        data[FIELD] = key
+    return data
+
+class _Entry:
+    __slots__ = ('fingerprint', 'response', 'expires', 'done')
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.response = None
+        self.expires = None
+        self.done = threading.Event()
+
+class IdempotencyCache:
+    """Recent idempotency keys and the responses they produced, bounded in count and age.
+
+    The first request with a key runs the handler; a retry with the same key
+    gets that response back without running the handler again, so it never
+    takes the junction lock or starts a second sequence. A retry that arrives
+    while the first is still running waits for it. Keys are scoped per handler
+    and must come with the same body; reusing one for a different body raises
+    a 422 RequestError. A handler that raises caches nothing.
+    """
+
+    def __init__(self, ttl_s=DEFAULT_TTL_S, capacity=DEFAULT_CAPACITY):
+        self.ttl = ttl_s
+        self.capacity = capacity
+        self._entries = OrderedDict()  # (scope, key) -> _Entry, oldest first
+        self._lock = threading.Lock()
+        self.replays = 0
+        self.misses = 0
+
+    def idempotent(self, handler):
+        """Decorator for handler(data) that honours data['idempotency_key']"""
+        scope = handler.__name__
+
+        @functools.wraps(handler)
+        def idempotent_handler(data):
+            key = data.get(FIELD) if isinstance(data, dict) else None
+            if not key:
+                return handler(data)
+            params = {name: value for name, value in data.items() if name != FIELD}
+            return self.run((scope, str(key)), repr(sorted(params.items())), lambda: handler(params))
+        return idempotent_handler
+
+    def run(self, key, fingerprint, compute):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                entry = self._entries.get(key)
+                if entry is not None and entry.expires is not None and entry.expires <= now:
+                    del self._entries[key]  # Expired behind a slower in-flight entry
+                    entry = None
+                if entry is None:
+                    entry = self._entries[key] = _Entry(fingerprint)
+                    self.misses += 1
+                    owner = True
+                else:
+                    owner = False
+            if owner:
+                break
+            if entry.fingerprint != fingerprint:
+                raise RequestError(f"{HEADER} was already used for a different request", UNPROCESSABLE)
+            entry.done.wait()
+            if entry.expires is not None:  # None: the first attempt failed, so try again
+                self.replays += 1
+                return entry.response
+        try:
+            response = compute()
+        except BaseException:
+            with self._lock:
+                self._entries.pop(key, None)
+            entry.done.set()
+            raise
+        with self._lock:
+            entry.response = response
+            entry.expires = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        entry.done.set()
+        return response
+
+    def _expire(self, now):
+        """Drop expired keys from the oldest end (call with lock held)"""
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry.expires is None or entry.expires > now:
+                return
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        return {
+            'keys': len(self._entries),
+            'replays': self.replays,
+            'misses': self.misses,
+            'ttl_s': self.ttl
+        }
@@ -0,0 +1,209 @@
+# 🚦 Junction Registry - per-junction traffic state and locks
+
+import threading
+import time
+from event_journal import JUNCTION_ID_BYTES
+from log_store import format_timestamp
+from state_codec import COLOURS, COLOUR_CODES, SIGNALS
+from metrics import TimedLock, merged
+from request_errors import RequestError
+
+DEFAULT_JUNCTION_ID = 'main'
+
+class Transition:
+    """One signal sequence running on a junction; repeated requests for it attach here"""
+    __slots__ = ('transition_id', 'channel', 'target', 'phases', 'step', 'started', 'finished', 'attached')
+
+    def __init__(self, transition_id, channel, target, phases, started):
+        self.transition_id = transition_id
+        self.channel = channel    # 'vehicle' or 'crossing<N>': one sequence per channel at a time
+        self.target = target      # Road or crossing the sequence ends on
+        self.phases = phases
+        self.step = -1            # Index of the last phase applied
+        self.started = started
+        self.finished = None
+        self.attached = 0         # Duplicate requests coalesced into this one
+
+    @property
+    def in_flight(self):
+        return self.finished is None
+
+    def status(self):
+        return {
+            'transition_id': self.transition_id,
+            'channel': self.channel,
+            'target': self.target,
+            'phase': self.phases[self.step] if self.step >= 0 else None,
+            'phases': list(self.phases),
+            'in_flight': self.in_flight,
+            'attached': self.attached,
+            'started': format_timestamp(int(self.started)),
+            'finished': format_timestamp(int(self.finished)) if self.finished else None
+        }
+
+def phase_name(callback):
+    name = callback.__name__
+    return name[:-len('_phase')] if name.endswith('_phase') else name
+
+class Junction:
+    """One traffic junction: its signal state, the lock that guards it and a version
+    that increases with every committed change.
+
+    signals holds one colour code per entry of state_codec.SIGNALS, so phases
+    write bytes at fixed indexes; state is the same thing as a name -> colour dict.
+    """
+    __slots__ = ('junction_id', 'signals', 'lock', 'version', 'committed_ns', 'transitions',
+                 '_transition_count', '_clock', '_waiters', '_waiters_lock')
+
+    def __init__(self, junction_id, initial_state, lock, clock=time.time):
+        self.junction_id = junction_id
+        self.signals = bytearray(COLOUR_CODES[initial_state[signal]] for signal in SIGNALS)
+        self.lock = lock
+        self.version = 1
+        self.committed_ns = None  # Wall-clock time of the last commit
+        self.transitions = {}  # channel -> latest Transition, in flight or finished
+        self._transition_count = 0
+        self._clock = clock
+        self._waiters = []
+        self._waiters_lock = threading.Lock()
+
+    @property
+    def state(self):
+        """The signals by name, e.g. {'road1': 'GREEN', ...} (a copy; call with lock held)"""
+        return {signal: COLOURS[code] for signal, code in zip(SIGNALS, self.signals)}
+
+    def snapshot(self):
+        """Copy of the state tagged with the junction id and version (call with lock held)"""
+        snapshot = self.state
+        snapshot['junction_id'] = self.junction_id
+        snapshot['version'] = self.version
+        return snapshot
+
+    def commit(self):
+        """Mark the state as changed, stamp committed_ns and return the new snapshot (call with lock held)"""
+        self.version += 1
+        self.committed_ns = time.time_ns()
+        return self.snapshot()
+
+    def in_flight(self, channel):
+        """The transition running on channel, or None (call with lock held)"""
+        transition = self.transitions.get(channel)
+        return transition if transition is not None and transition.in_flight else None
+
+    def begin(self, channel, target, steps, names=None):
+        """Record a new transition on channel and return (transition, steps that keep it current).
+
+        The returned steps are the scheduler's (delay, callback, args) steps. Each
+        callback runs with the junction lock held, and the transition moves on to
+        its phase in the same critical section, so no reader sees a phase applied
+        but not recorded. The last phase finishes the transition, and so does a
+        phase that raises (the scheduler drops the rest of its sequence). names
+        labels the phases (default: the callback names). Call with lock held.
+        """
+        self._transition_count += 1
+        if names is None:
+            names = [phase_name(callback) for _, callback, _ in steps]
+        transition = Transition(f'{self.junction_id}:{self._transition_count}', channel, target,
+                                names, self._clock())
+        self.transitions[channel] = transition
+        last = len(steps) - 1
+        tracked = [(delay, self._advance, (transition, index, index == last, callback, args))
+                   for index, (delay, callback, args) in enumerate(steps)]
+        return transition, tracked
+
+    def _advance(self, transition, index, last, callback, args):
+        completed = False
+        with self.lock:
+            try:
+                callback(*args)
+                transition.step = index
+                completed = True
+            finally:
+                if last or not completed:
+                    transition.finished = self._clock()
+
+    def find_transition(self, transition_id):
+        """The latest transition on any channel with this id, or None (call with lock held)"""
+        for transition in self.transitions.values():
+            if transition.transition_id == transition_id:
+                return transition
+        return None
+
+    def add_waiter(self, since, callback):
+        """Call callback on the next notify(); False if the version already moved past since"""
+        with self._waiters_lock:
+            if self.version != since:
+                return False
+            self._waiters.append(callback)
+            return True
+
+    def remove_waiter(self, callback):
+        with self._waiters_lock:
+            if callback in self._waiters:
+                self._waiters.remove(callback)
+
+    def notify(self):
+        """Wake everyone waiting for a change (called off the junction lock)"""
+        with self._waiters_lock:
+            waiters, self._waiters = self._waiters, []
+        for callback in waiters:
+            callback()
+
+class JunctionRegistry:
+    """Junctions keyed by id. The default junction always exists; control
+    commands create others on first use (get), while reads use find, so an
+    unknown or mistyped id never turns into a junction.
+
+    Lookups of existing junctions take no lock at all; the registry lock is only
+    held while a new junction is inserted, so traffic on one junction never
+    waits on another. Each junction lock keeps its own wait and hold
+    histograms; lock_wait() and lock_hold() merge them when they are read.
+    """
+
+    def __init__(self, initial_state, clock=time.time):
+        self._initial_state = dict(initial_state)
+        self._clock = clock  # Timestamps transitions; a simulation passes its virtual clock
+        self._junctions = {}
+        self._create_lock = threading.Lock()
+        self.get(DEFAULT_JUNCTION_ID)
+
+    def find(self, junction_id=None):
+        """The junction with this id, or None if there is none; never creates one"""
+        return self._junctions.get(DEFAULT_JUNCTION_ID if junction_id in (None, '') else str(junction_id))
+
+    def get(self, junction_id=None):
+        """The junction with this id, created if it does not exist yet"""
+        junction_id = DEFAULT_JUNCTION_ID if junction_id in (None, '') else str(junction_id)
+        junction = self._junctions.get(junction_id)
+        if junction is None:
+            if len(junction_id.encode('utf-8')) > JUNCTION_ID_BYTES:  # The journal stores ids whole
+                raise RequestError(f"junction_id must be at most {JUNCTION_ID_BYTES} bytes")
+            with self._create_lock:
+                junction = self._junctions.get(junction_id)
+                if junction is None:
+                    junction = Junction(junction_id, self._initial_state, TimedLock(), self._clock)
+                    self._junctions[junction_id] = junction
+        return junction
+
+    def notify(self, snapshot):
+        """Wake long-polls waiting on the junction a published snapshot belongs to"""
+        self.get(snapshot['junction_id']).notify()
+
+    def lock_wait(self):
+        """Waits for every junction lock, merged from the per-junction histograms on read"""
+        return merged(junction.lock.wait for junction in self)
+
+    def lock_hold(self):
+        return merged(junction.lock.hold for junction in self)
+
+    def lock_stats(self):
+        return {'wait': self.lock_wait().summary(), 'hold': self.lock_hold().summary()}
+
+    def ids(self):
+        return list(self._junctions)
+
+    def __len__(self):
+        return len(self._junctions)
+
+    def __iter__(self):
+        return iter(list(self._junctions.values()))
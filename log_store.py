@@ -0,0 +1,131 @@
+# 📝 Log Store - fixed-capacity ring buffer of compact, sequence-numbered log records
+
+import datetime
+import sys
+import threading
+import time
+import uuid
+from array import array
+from functools import lru_cache
+
+DEFAULT_CAPACITY = 100000
+
+@lru_cache(maxsize=4096)
+def format_timestamp(seconds):
+    return datetime.datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M:%S")
+
+class LogRing:
+    """Ring buffer of log records held in parallel columns.
+
+    Numbers live in typed arrays, log types are one-byte codes and strings are
+    interned, so an entry costs a few dozen bytes instead of a dict. Every entry
+    gets a monotonically increasing sequence number; slot = seq % capacity.
+    Dicts are only built for the slice a reader asks for. Sequence numbers
+    start over with each ring, so epoch tells one ring's numbers from another's
+    (a dashboard can outlive a server restart).
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._ts = array('q', bytes(8 * capacity))
+        self._type = array('B', bytes(capacity))
+        self._success = array('b', bytes(capacity))
+        self._action = [None] * capacity
+        self._message = [None] * capacity
+        self._junction = [None] * capacity
+        self._type_names = []
+        self._type_codes = {}
+        self.first_seq = 1  # Oldest retained entry
+        self.next_seq = 1   # Sequence number of the next append
+        self.cleared_seq = 0  # Newest entry dropped by the last clear()
+        self.epoch = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.next_seq - self.first_seq
+
+    @property
+    def last_seq(self):
+        return self.next_seq - 1
+
+    def _type_code(self, log_type):
+        code = self._type_codes.get(log_type)
+        if code is None:
+            code = len(self._type_names)
+            self._type_names.append(sys.intern(log_type))
+            self._type_codes[log_type] = code
+        return code
+
+    def append(self, log_type, action, message, success=True, junction_id=None, ts_ns=None):
+        """Store one record and return its sequence number"""
+        with self._lock:
+            return self._append(log_type, action, message, success, junction_id, ts_ns)
+
+    def extend(self, records):
+        """Store (log_type, action, message, success, junction_id, ts_ns) records under one lock"""
+        with self._lock:
+            return [self._append(*record) for record in records]
+
+    def _append(self, log_type, action, message, success, junction_id, ts_ns):
+        seq = self.next_seq
+        slot = seq % self.capacity
+        self._ts[slot] = ts_ns if ts_ns is not None else time.time_ns()
+        self._type[slot] = self._type_code(log_type)
+        self._success[slot] = 1 if success else 0
+        self._action[slot] = sys.intern(action)
+        self._message[slot] = sys.intern(message)
+        self._junction[slot] = sys.intern(junction_id) if junction_id is not None else None
+        self.next_seq = seq + 1
+        if self.next_seq - self.first_seq > self.capacity:
+            self.first_seq = self.next_seq - self.capacity
+        return seq
+
+    def entry(self, seq):
+        slot = seq % self.capacity
+        ts_ns = self._ts[slot]
+        success = bool(self._success[slot])
+        return {
+            'seq': seq,
+            'timestamp': format_timestamp(ts_ns // 1_000_000_000),
+            'ts_ns': ts_ns,
+            'type': self._type_names[self._type[slot]],
+            'action': self._action[slot],
+            'message': self._message[slot],
+            'success': success,
+            'status': '✅ SUCCESS' if success else '❌ ERROR',
+            'junction_id': self._junction[slot]
+        }
+
+    def tail(self, count):
+        """The newest count entries, oldest first"""
+        with self._lock:
+            start = max(self.first_seq, self.next_seq - count)
+            return [self.entry(seq) for seq in range(start, self.next_seq)]
+
+    def since(self, after_seq, limit=None):
+        """Entries with seq > after_seq, oldest first, at most limit of them"""
+        with self._lock:
+            start = max(self.first_seq, after_seq + 1)
+            stop = self.next_seq if limit is None else min(self.next_seq, start + limit)
+            return [self.entry(seq) for seq in range(start, stop)]
+
+    def delta(self, after_seq, limit):
+        """What a client that last saw after_seq is missing: (entries, reset).
+
+        reset is True when some of those entries are gone (cleared or
+        overwritten), when the client still holds entries that were cleared, or
+        when after_seq is one this ring never issued; the client should then
+        replace its copy rather than append.
+        """
+        with self._lock:
+            reset = (after_seq < self.first_seq - 1 or after_seq <= self.cleared_seq
+                     or after_seq >= self.next_seq)
+            start = self.first_seq if reset else max(self.first_seq, after_seq + 1)
+            stop = min(self.next_seq, start + limit)
+            return [self.entry(seq) for seq in range(start, stop)], reset
+
+    def clear(self):
+        """Drop all entries; sequence numbers keep increasing"""
+        with self._lock:
+            self.first_seq = self.next_seq
+            self.cleared_seq = self.next_seq - 1
@@ -0,0 +1,54 @@
+# ⏳ Long Poll - park a request until a junction's state version moves on
+
+import asyncio
+import threading
+
+MAX_TIMEOUT = 30.0
+
+class LongPoll:
+    """Returned by a handler instead of a body: answer once the junction changes.
+
+    respond() builds the body when the junction's version differs from since;
+    if it is still unchanged after timeout seconds the result is None (HTTP 304).
+    Flask threads block on an Event, the asyncio server awaits a Future, and an
+    idle waiter costs nothing until the publisher thread wakes it.
+    """
+
+    def __init__(self, junction, since, timeout, respond):
+        self.junction = junction
+        self.since = since
+        self.timeout = min(max(timeout, 0.0), MAX_TIMEOUT)
+        self.respond = respond
+
+    def changed(self):
+        return self.junction.version != self.since
+
+    def result(self):
+        return self.respond() if self.changed() else None
+
+    def wait(self):
+        if self.timeout and not self.changed():
+            event = threading.Event()
+            if self.junction.add_waiter(self.since, event.set):
+                try:
+                    event.wait(self.timeout)
+                finally:
+                    self.junction.remove_waiter(event.set)
+        return self.result()
+
+    async def wait_async(self):
+        if self.timeout and not self.changed():
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+
+            def wake():
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+            if self.junction.add_waiter(self.since, wake):
+                try:
+                    await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    self.junction.remove_waiter(wake)
+        return self.result()
@@ -0,0 +1,265 @@
+# 📏 Metrics - HDR-style latency histograms, timed locks and Prometheus exposition
+
+import functools
+import os
+import threading
+import time
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+BUCKET_COUNT = 64 * SUB_BUCKETS
+
+# Fixed `le` bounds (seconds) for Prometheus; the HDR buckets are folded into them on scrape
+PROMETHEUS_BOUNDS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                     0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def bucket_index(value):
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKETS + ((value >> shift) & (SUB_BUCKETS - 1))
+
+def bucket_upper_bound(index):
+    if index < SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    mantissa = SUB_BUCKETS + index % SUB_BUCKETS
+    return ((mantissa + 1) << shift) - 1
+
+class Histogram:
+    """Log-linear histogram of nanosecond durations.
+
+    Each power of two is split into 16 linear sub-buckets, so any recorded value
+    is reported within ~6% over the full range from nanoseconds to hours, with a
+    fixed 1024-slot table and O(1) recording.
+    """
+
+    def __init__(self):
+        self._counts = [0] * BUCKET_COUNT
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value_ns):
+        value_ns = max(0, int(value_ns))
+        index = bucket_index(value_ns)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value_ns
+            if value_ns > self.max:
+                self.max = value_ns
+
+    def percentile(self, percent):
+        with self._lock:
+            if not self.count:
+                return 0
+            target = max(1, int(self.count * percent / 100.0 + 0.5))
+            seen = 0
+            for index, bucket_count in enumerate(self._counts):
+                seen += bucket_count
+                if seen >= target:
+                    return min(bucket_upper_bound(index), self.max)
+        return self.max
+
+    def state(self):
+        """(counts, count, total, max) as plain data, e.g. to send to another process"""
+        with self._lock:
+            return list(self._counts), self.count, self.total, self.max
+
+    def merge(self, state):
+        """Add in the recordings of another Histogram's state()"""
+        counts, count, total, max_ns = state
+        with self._lock:
+            for index, bucket_count in enumerate(counts):
+                self._counts[index] += bucket_count
+            self.count += count
+            self.total += total
+            self.max = max(self.max, max_ns)
+
+    def cumulative(self, bounds_ns):
+        """(counts at or below each bound, count, total) from one consistent view"""
+        with self._lock:
+            counts = list(self._counts)
+            count, total = self.count, self.total
+        cumulative = []
+        seen = 0
+        index = 0
+        for bound in bounds_ns:
+            while index < BUCKET_COUNT and bucket_upper_bound(index) <= bound:
+                seen += counts[index]
+                index += 1
+            cumulative.append(seen)
+        return cumulative, count, total
+
+    def summary(self):
+        """Counts and percentiles in microseconds"""
+        return {
+            'count': self.count,
+            'mean_us': round(self.total / self.count / 1000, 3) if self.count else 0.0,
+            'p50_us': round(self.percentile(50) / 1000, 3),
+            'p99_us': round(self.percentile(99) / 1000, 3),
+            'p999_us': round(self.percentile(99.9) / 1000, 3),
+            'max_us': round(self.max / 1000, 3)
+        }
+
+def merged(histograms):
+    """One Histogram holding the recordings of all the given ones"""
+    total = Histogram()
+    for histogram in histograms:
+        total.merge(histogram.state())
+    return total
+
+class TimedLock:
+    """threading.Lock that records how long callers waited for it and held it.
+
+    Each lock has its own pair of histograms, so locks never share one, and
+    both samples are recorded after the lock is released, never while it is held.
+    """
+    __slots__ = ('_lock', 'wait', 'hold', '_acquired_at', '_waited')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait = Histogram()
+        self.hold = Histogram()
+        self._acquired_at = 0
+        self._waited = 0
+
+    def acquire(self, blocking=True, timeout=-1):
+        started = time.perf_counter_ns()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._acquired_at = time.perf_counter_ns()
+            self._waited = self._acquired_at - started
+        return acquired
+
+    def release(self):
+        waited = self._waited
+        held = time.perf_counter_ns() - self._acquired_at
+        self._lock.release()
+        self.wait.record(waited)
+        self.hold.record(held)
+
+    def locked(self):
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+def process_cpu_seconds():
+    """User + system CPU time of this process, all threads"""
+    return round(time.process_time(), 6)
+
+def process_resident_bytes():
+    """Current resident set size; 0 where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+def process_open_fds():
+    """Open file descriptors (sockets, journal segments, ...); 0 where /proc is unavailable"""
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return 0
+
+def process_socket_count():
+    """Open descriptors that are sockets; 0 where /proc is unavailable"""
+    count = 0
+    try:
+        for fd in os.listdir('/proc/self/fd'):
+            try:
+                count += os.readlink(f'/proc/self/fd/{fd}').startswith('socket:')
+            except OSError:
+                pass  # Closed while listing
+    except OSError:
+        return 0
+    return count
+
+def label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                          for name, value in labels) + '}'
+
+class MetricsRegistry:
+    """Histogram and gauge families rendered in the Prometheus text format.
+
+    Recording stays a Histogram.record call; all aggregation happens when
+    /metrics is scraped. Gauges are callbacks returning a value or a dict of
+    label tuples to values, read at scrape time.
+    """
+
+    def __init__(self, prefix='traffic_'):
+        self.prefix = prefix
+        self._histograms = {}  # name -> (help, {labels: Histogram})
+        self._gauges = {}      # name -> (help, callback)
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text, **labels):
+        label_key = tuple(sorted(labels.items()))
+        family = self._histograms.get(name)
+        if family is None or label_key not in family[1]:
+            with self._lock:
+                family = self._histograms.setdefault(name, (help_text, {}))
+                family[1].setdefault(label_key, Histogram())
+        return family[1][label_key]
+
+    def register_histogram(self, name, help_text, histogram, **labels):
+        """Export a Histogram owned by another component (or a callable returning it)"""
+        with self._lock:
+            family = self._histograms.setdefault(name, (help_text, {}))
+            family[1][tuple(sorted(labels.items()))] = histogram
+
+    def gauge(self, name, help_text, callback):
+        self._gauges[name] = (help_text, callback)
+
+    def timed(self, endpoint):
+        """Decorator: record each call's duration under request_duration_seconds{endpoint=...}"""
+        def decorate(handler):
+            histogram = self.histogram('request_duration_seconds',
+                                       'Time spent in the API handler (excludes long-poll waits and streaming)',
+                                       endpoint=endpoint)
+
+            @functools.wraps(handler)
+            def timed_handler(*args, **kwargs):
+                started = time.perf_counter_ns()
+                try:
+                    return handler(*args, **kwargs)
+                finally:
+                    histogram.record(time.perf_counter_ns() - started)
+            return timed_handler
+        return decorate
+
+    def render(self):
+        bounds_ns = [int(bound * 1e9) for bound in PROMETHEUS_BOUNDS]
+        lines = []
+        for name, (help_text, series) in sorted(self._histograms.items()):
+            full = self.prefix + name
+            lines.append(f'# HELP {full} {help_text}')
+            lines.append(f'# TYPE {full} histogram')
+            for labels, histogram in sorted(series.items()):
+                if callable(histogram):
+                    histogram = histogram()  # Resolved per scrape, e.g. a swappable scheduler
+                cumulative, count, total = histogram.cumulative(bounds_ns)
+                for bound, seen in zip(PROMETHEUS_BOUNDS, cumulative):
+                    lines.append(f'{full}_bucket{label_text(labels + (("le", repr(bound)),))} {seen}')
+                lines.append(f'{full}_bucket{label_text(labels + (("le", "+Inf"),))} {count}')
+                lines.append(f'{full}_sum{label_text(labels)} {total / 1e9!r}')
+                lines.append(f'{full}_count{label_text(labels)} {count}')
+        for name, (help_text, callback) in sorted(self._gauges.items()):
+            full = self.prefix + name
+            lines.append(f'# HELP {full} {help_text}')
+            lines.append(f'# TYPE {full} gauge')
+            value = callback()
+            if isinstance(value, dict):
+                for labels, sample in sorted(value.items()):
+                    lines.append(f'{full}{label_text(labels)} {sample}')
+            else:
+                lines.append(f'{full} {value}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,77 @@
+# 📦 Payload Cache - serialize once per version, share the bytes with every reader
+
+import json
+import threading
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the standard library encoder
+    orjson = None
+
+if orjson is not None:
+    def dumps(obj):
+        """Compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    loads = orjson.loads
+else:
+    def dumps(obj):
+        """Compact UTF-8 JSON bytes"""
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    loads = json.loads
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider (jsonify, request.get_json) backed by orjson when available"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+class SocketJSON:
+    """json-module stand-in for python-socketio's packet encoder (json= option)"""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return loads(s)
+
+class PayloadCache:
+    """Serialized JSON fragments keyed by name, rebuilt only when their version changes.
+
+    build() is only called on a miss; every reader of the same version gets the
+    same bytes object. join_object() splices cached and live parts into one
+    response body without decoding anything.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # Callers read version before build() runs, so the bytes are never older than the key
+        payload = dumps(build())
+        with self._lock:
+            self._entries[key] = (version, payload)
+        return payload
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+def join_object(fields):
+    """JSON object bytes from (name, serialized value) pairs"""
+    return b'{' + b','.join(dumps(name) + b':' + value for name, value in fields) + b'}'
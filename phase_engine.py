@@ -0,0 +1,159 @@
+# ⚙️ Phase Engine - signal plans compiled to integer-indexed tables, run by one core
+
+from collections import namedtuple
+from request_errors import RequestError
+from state_codec import COLOUR_CODES, SIGNALS
+
+RED = COLOUR_CODES['RED']
+YELLOW = COLOUR_CODES['YELLOW']
+GREEN = COLOUR_CODES['GREEN']
+SIGNAL_INDEX = {signal: index for index, signal in enumerate(SIGNALS)}
+
+# Command kinds - rows of a compiled plan's command table
+VEHICLE = 0
+CROSSING = 1
+TARGET_PARAMS = ('road_id', 'crossing_id')  # Request field that names each kind's target
+
+# Plan definitions. Text fields may use {target} (the road or crossing asked for) and
+# {other} (the opposite one), filled in once per target when the plan is compiled;
+# console lines may also use {jid} and {message}, filled in when they are printed.
+PhaseSpec = namedtuple('PhaseSpec', 'name delay sets message console derive',
+                       defaults=(None, False))
+CommandSpec = namedtuple('CommandSpec', 'kind targets channel log_type action guard reject deny_console '
+                         'started start_log joined join_log busy phases')
+
+Phase = namedtuple('Phase', 'name sets derive log_type action message console')
+Command = namedtuple('Command', 'target channel log_type action guard reject deny_console started start_log '
+                     'joined join_log busy phases phase_names')
+
+def fill(template, target):
+    if template is None:
+        return None
+    return template.replace('{target}', str(target)).replace('{other}', str(3 - target))
+
+class PhasePlan:
+    """A set of commands, each a guarded sequence of timed phases, compiled for fast execution.
+
+    Every signal name and colour is resolved to its index and code here, and
+    every log and response message is rendered per target, so running a
+    command is table lookups and byte writes: no key building or string
+    comparison per call. derived lists (signal, source) pairs where the signal
+    shows GREEN exactly while the source is RED; phases with derive=True
+    recompute them. Which transitions are allowed is each command's guard: the
+    one (signal, colour) that refuses it, since no plan here needs more.
+    """
+
+    def __init__(self, name, commands, derived=(), log_rejections_as_errors=True):
+        self.name = name
+        self.derived = tuple((SIGNAL_INDEX[signal], SIGNAL_INDEX[source]) for signal, source in derived)
+        self.log_rejections_as_errors = log_rejections_as_errors
+        kinds = max(spec.kind for spec in commands) + 1
+        self.commands = [[] for _ in range(kinds)]  # kind -> target -> Command (index 0 unused)
+        for spec in commands:
+            table = self.commands[spec.kind]
+            table.extend([None] * (max(spec.targets) + 1 - len(table)))
+            for target in spec.targets:
+                table[target] = self._compile(spec, target)
+
+    def _compile(self, spec, target):
+        phases = tuple(
+            (phase.delay, Phase(phase.name,
+                                tuple((SIGNAL_INDEX[fill(signal, target)], COLOUR_CODES[colour])
+                                      for signal, colour in phase.sets.items()),
+                                phase.derive, spec.log_type, fill(spec.action, target),
+                                fill(phase.message, target), fill(phase.console, target)))
+            for phase in spec.phases
+        )
+        guard = None
+        if spec.guard is not None:
+            signal, colour = spec.guard
+            guard = (SIGNAL_INDEX[fill(signal, target)], COLOUR_CODES[colour])
+        return Command(target, fill(spec.channel, target), spec.log_type, fill(spec.action, target), guard,
+                       fill(spec.reject, target), fill(spec.deny_console, target), fill(spec.started, target),
+                       fill(spec.start_log, target), fill(spec.joined, target), fill(spec.join_log, target),
+                       fill(spec.busy, target), phases, [phase.name for _, phase in phases])
+
+    def command(self, kind, target):
+        """The compiled command for a target such as road_id; a 400 RequestError if the plan has none"""
+        table = self.commands[kind] if kind < len(self.commands) else []
+        try:
+            index = int(target)
+        except (TypeError, ValueError):
+            index = 0
+        command = table[index] if 0 < index < len(table) else None
+        if command is None:
+            targets = ', '.join(str(entry.target) for entry in table if entry is not None)
+            if not targets:
+                raise RequestError(f"The {self.name} plan takes no {TARGET_PARAMS[kind]}")
+            raise RequestError(f"{TARGET_PARAMS[kind]} must be one of {targets}")
+        return command
+
+class PhaseEngine:
+    """Runs a PhasePlan's commands against junctions.
+
+    start() is called with the junction lock held (by the REST handlers and by
+    JSON-RPC batches); it coalesces repeats into the transition in flight,
+    applies the guard, then hands the phases to the scheduler. Each phase runs
+    under the junction lock (Junction.begin takes it), writes its signal codes,
+    commits and publishes the snapshot with its committed_ns stamp.
+    scheduler is a callable so the server can swap schedulers after startup.
+    """
+
+    def __init__(self, plan, scheduler, publish, log, console=None):
+        self.plan = plan
+        self._scheduler = scheduler
+        self._publish = publish
+        self._log = log
+        self._console = console
+
+    def start(self, junction, kind, target, log):
+        command = self.plan.command(kind, target)
+        jid = junction.junction_id
+        current = junction.in_flight(command.channel)
+        if current is not None:
+            if current.target == command.target:
+                current.attached += 1
+                log(command.log_type, command.action, command.join_log, success=True, junction_id=jid)
+                return {"success": True, "message": command.joined, "junction_id": jid,
+                        "transition": current.status()}
+            busy = self.plan.command(kind, current.target).busy
+            return self._reject(junction, command, busy, log, current)
+
+        guard = command.guard
+        if guard is not None and junction.signals[guard[0]] == guard[1]:
+            return self._reject(junction, command, command.reject, log)
+
+        transition, steps = junction.begin(command.channel, command.target,
+                                           [(delay, self._run_phase, (junction, phase))
+                                            for delay, phase in command.phases],
+                                           command.phase_names)
+        self._scheduler().run_sequence(steps)
+        if command.start_log:
+            log(command.log_type, command.action, command.start_log, success=True, junction_id=jid)
+        return {"success": True, "message": command.started, "junction_id": jid,
+                "transition": transition.status()}
+
+    def _reject(self, junction, command, message, log, current=None):
+        jid = junction.junction_id
+        log(command.log_type, command.action, message,
+            success=not self.plan.log_rejections_as_errors, junction_id=jid)
+        if self._console is not None and command.deny_console:
+            self._console(command.deny_console.format(jid=jid, message=message))
+        result = {"success": False, "message": message, "junction_id": jid}
+        if current is not None:
+            result['transition'] = current.status()
+        return result
+
+    def _run_phase(self, junction, phase):
+        """One timed phase (called with the junction lock held)"""
+        jid = junction.junction_id
+        signals = junction.signals
+        for index, code in phase.sets:
+            signals[index] = code
+        if phase.derive:
+            for index, source in self.plan.derived:
+                signals[index] = GREEN if signals[source] == RED else RED
+        self._publish(junction.commit(), junction.committed_ns)
+        self._log(phase.log_type, phase.action, phase.message, success=True, junction_id=jid)
+        if self._console is not None and phase.console:
+            self._console(phase.console.format(jid=jid))
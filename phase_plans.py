@@ -0,0 +1,72 @@
+# 🗺️ Phase Plans - the signal sequences each server runs on the phase engine
+
+from phase_engine import PhasePlan, PhaseSpec, CommandSpec, VEHICLE, CROSSING
+
+# Enhanced server: manual pedestrian crossings, vehicle switches with console narration
+ENHANCED_PLAN = PhasePlan('enhanced', [
+    CommandSpec(
+        kind=VEHICLE, targets=(1, 2), channel='vehicle',
+        log_type='VEHICLE', action='Switch to Road {target}',
+        guard=('road{target}', 'GREEN'),
+        reject='Road {target} is already GREEN',
+        deny_console='❌ [{jid}] Vehicle request denied: {message}',
+        started='Traffic switch to Road {target} initiated successfully',
+        start_log='Traffic switch sequence started',
+        joined='Traffic switch to Road {target} already in progress',
+        join_log='Joined the switch already in progress',
+        busy='Switch to Road {target} is in progress',
+        phases=(
+            PhaseSpec('vehicle_yellow', 0, {'road{other}': 'YELLOW', 'road{target}': 'RED'},
+                      'Road {other} changed to YELLOW (warning phase)',
+                      '🟡 [{jid}] Road {other} → YELLOW (3 second warning)'),
+            PhaseSpec('vehicle_clearance', 3, {'road{other}': 'RED'},
+                      'Road {other} changed to RED (clearance phase)',
+                      '🔴 [{jid}] Road {other} → RED (2 second clearance)'),
+            PhaseSpec('vehicle_green', 2, {'road{target}': 'GREEN'},
+                      'Road {target} changed to GREEN (go phase)',
+                      '🟢 [{jid}] Road {target} → GREEN (vehicles can proceed)')
+        )),
+    CommandSpec(
+        kind=CROSSING, targets=(1, 2), channel='crossing{target}',
+        log_type='PEDESTRIAN', action='Crossing {target}',
+        guard=('road{target}', 'GREEN'),
+        reject='Cannot cross - Road {target} is GREEN for vehicles',
+        deny_console='❌ [{jid}] Pedestrian crossing {target} denied: {message}',
+        started='Pedestrian crossing {target} initiated successfully',
+        start_log=None,
+        joined='Pedestrian crossing {target} already in progress',
+        join_log='Joined the crossing already in progress',
+        busy='Pedestrian crossing {target} is in progress',
+        phases=(
+            PhaseSpec('pedestrian_walk', 0, {'pedestrian{target}': 'GREEN'},
+                      'Pedestrian crossing {target} started (8 seconds)',
+                      '🚶 [{jid}] Pedestrian crossing {target} started - GREEN for 8 seconds'),
+            PhaseSpec('pedestrian_stop', 8, {'pedestrian{target}': 'RED'},
+                      'Pedestrian crossing {target} completed',
+                      '🛑 [{jid}] Pedestrian crossing {target} completed - back to RED')
+        ))
+])
+
+# Auto pedestrian server: vehicle switches only; each crossing follows its road
+# (GREEN to walk while the road is RED), recomputed when the new road turns GREEN
+AUTO_PLAN = PhasePlan('auto_pedestrian', [
+    CommandSpec(
+        kind=VEHICLE, targets=(1, 2), channel='vehicle',
+        log_type='VEHICLE', action='Switch to Road {target}',
+        guard=('road{target}', 'GREEN'),
+        reject='Road {target} is already GREEN',
+        deny_console=None,
+        started='Traffic switch to Road {target} initiated successfully',
+        start_log='Traffic switch sequence started',
+        joined='Traffic switch to Road {target} already in progress',
+        join_log='Joined the switch already in progress',
+        busy='Switch to Road {target} is in progress',
+        phases=(
+            PhaseSpec('vehicle_yellow', 0, {'road{other}': 'YELLOW', 'road{target}': 'RED'},
+                      'Road {other} changed to YELLOW'),
+            PhaseSpec('vehicle_clearance', 3, {'road{other}': 'RED'},
+                      'Road {other} changed to RED'),
+            PhaseSpec('vehicle_green', 2, {'road{target}': 'GREEN'},
+                      'Road {target} changed to GREEN', derive=True)
+        ))
+], derived=(('pedestrian1', 'road1'), ('pedestrian2', 'road2')), log_rejections_as_errors=False)
@@ -0,0 +1,27 @@
+# ⚠️ Request Errors - requests the server refuses, answered with an HTTP status by both web stacks
+
+BAD_REQUEST = 400
+NOT_FOUND = 404
+UNPROCESSABLE = 422
+
+class RequestError(ValueError):
+    """Raised by a handler for input it cannot act on.
+
+    The Flask routes and the asyncio stack answer with status and body();
+    JSON-RPC reports it as invalid params, like any other ValueError.
+    """
+
+    def __init__(self, message, status=BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+    def body(self):
+        return {"success": False, "message": self.message}
+
+def number(params, name, default, kind=int):
+    """params[name] (or default) converted with kind; a malformed value is a 400"""
+    try:
+        return kind(params.get(name, default))
+    except (TypeError, ValueError):
+        raise RequestError(f"{name} must be a number") from None
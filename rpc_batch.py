@@ -0,0 +1,82 @@
+# 📦 JSON-RPC 2.0 Batch Execution - many commands, one lock round-trip per junction
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+def rpc_error(call_id, code, message):
+    return {'jsonrpc': '2.0', 'id': call_id, 'error': {'code': code, 'message': message}}
+
+def is_notification(call):
+    return (isinstance(call, dict) and 'id' not in call and call.get('jsonrpc') == '2.0'
+            and isinstance(call.get('method'), str))
+
+def execute_batch(payload, registry, methods, make_log_entry, commit_logs, read_only=()):
+    """Execute a JSON-RPC request or batch against the junction registry.
+
+    methods maps a method name to handler(junction, params, log), called with
+    the junction lock held; log takes the same arguments as the server's
+    add_log. Calls are grouped by junction so each junction lock is taken once,
+    log entries are committed in one go (one log_update broadcast), and
+    responses come back in request order. Notifications (no id) get no response.
+    Methods named in read_only only look junctions up; the others may create them.
+    """
+    if payload is None:
+        return rpc_error(None, PARSE_ERROR, 'Parse error')
+    single = isinstance(payload, dict)
+    calls = [payload] if single else payload
+    if not isinstance(calls, list) or not calls:
+        return rpc_error(None, INVALID_REQUEST, 'Invalid Request')
+
+    responses = [None] * len(calls)
+    by_junction = {}
+    for index, call in enumerate(calls):
+        if not isinstance(call, dict) or call.get('jsonrpc') != '2.0' or not isinstance(call.get('method'), str):
+            responses[index] = rpc_error(None, INVALID_REQUEST, 'Invalid Request')
+            continue
+        call_id = call.get('id')
+        handler = methods.get(call['method'])
+        if handler is None:
+            responses[index] = rpc_error(call_id, METHOD_NOT_FOUND, f"Method not found: {call['method']}")
+            continue
+        params = call.get('params') or {}
+        if not isinstance(params, dict):
+            responses[index] = rpc_error(call_id, INVALID_PARAMS, 'Params must be an object')
+            continue
+        try:
+            if call['method'] in read_only:
+                junction = registry.find(params.get('junction_id'))
+                if junction is None:
+                    raise ValueError(f"Unknown junction {params.get('junction_id')}")
+            else:
+                junction = registry.get(params.get('junction_id'))
+        except ValueError as exc:
+            responses[index] = rpc_error(call_id, INVALID_PARAMS, f'Invalid params: {exc}')
+            continue
+        by_junction.setdefault(junction, []).append((index, call_id, handler, params))
+
+    pending_logs = []
+    def log(*args, **kwargs):
+        pending_logs.append(make_log_entry(*args, **kwargs))
+
+    for junction, work in by_junction.items():
+        with junction.lock:
+            for index, call_id, handler, params in work:
+                try:
+                    result = handler(junction, params, log)
+                except (KeyError, TypeError, ValueError) as exc:
+                    responses[index] = rpc_error(call_id, INVALID_PARAMS, f'Invalid params: {exc}')
+                except Exception as exc:
+                    responses[index] = rpc_error(call_id, INTERNAL_ERROR, str(exc))
+                else:
+                    responses[index] = {'jsonrpc': '2.0', 'id': call_id, 'result': result}
+
+    if pending_logs:
+        commit_logs(pending_logs)
+
+    responses = [response for call, response in zip(calls, responses) if not is_notification(call)]
+    if single:
+        return responses[0] if responses else None
+    return responses
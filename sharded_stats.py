@@ -0,0 +1,48 @@
+# 🔢 Sharded Stats - per-thread counters, aggregated on read
+
+import itertools
+import threading
+
+class ShardedCounters:
+    """Named counters where every thread increments only its own shard.
+
+    A shard has exactly one writer, so increments are exact without any lock;
+    readers sum all shards. Shards of threads that have exited are folded into
+    a retired total on read, so thread-per-request servers do not pile them up.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self._local = threading.local()
+        self._shards = {}
+        self._keys = itertools.count()
+        self._retired = dict.fromkeys(self.names, 0)
+        self._fold_lock = threading.Lock()  # Readers only
+
+    def _shard(self):
+        shard = dict.fromkeys(self.names, 0)
+        self._local.shard = shard
+        self._shards[next(self._keys)] = (threading.current_thread(), shard)
+        return shard
+
+    def incr(self, name, amount=1):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        shard[name] += amount
+
+    def snapshot(self):
+        with self._fold_lock:
+            totals = dict(self._retired)
+            for key, (thread, shard) in list(self._shards.items()):
+                for name in self.names:
+                    totals[name] += shard[name]
+                if not thread.is_alive():
+                    for name in self.names:
+                        self._retired[name] += shard[name]
+                    del self._shards[key]
+            return totals
+
+    def shard_count(self):
+        return len(self._shards)
@@ -0,0 +1,252 @@
+# 🧫 Soak Test - hours of steady load on both servers, watching for slow leaks and pile-ups
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import time
+
+import aiohttp
+from bench_control_rpc import random_road, spawn_server, stop_server, wait_until_up
+from bench_fanout import raise_fd_limit, scrape_gauges
+
+# /metrics gauges sampled every interval, and the least growth worth flagging for each
+WATCHED = {
+    'traffic_process_resident_memory_bytes': 4 * 2**20,
+    'traffic_process_threads': 2,
+    'traffic_process_open_fds': 4,
+    'traffic_process_open_sockets': 4,
+    'traffic_publisher_queue_depth': 100,
+    'traffic_scheduler_queue_depth': 100,
+    'traced_bytes': 2 * 2**20
+}
+EXPECTED_GROWTH = ('traffic_journal_events',)  # Durable history grows by design; reported, not flagged
+BOUNDED = {'traffic_log_ring_entries': 'traffic_log_ring_capacity'}  # Fills up, flagged only past its bound
+
+def parse_duration(text):
+    """'90', '45s', '30m' or '6h' as seconds"""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    if text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+def slope(points):
+    """Least-squares slope of (t, value) points, per second"""
+    count = len(points)
+    if count < 2:
+        return 0.0
+    mean_t = sum(t for t, _ in points) / count
+    mean_v = sum(v for _, v in points) / count
+    spread = sum((t - mean_t) ** 2 for t, _ in points)
+    if not spread:
+        return 0.0
+    return sum((t - mean_t) * (v - mean_v) for t, v in points) / spread
+
+def trends(samples, window, tolerance):
+    """Per metric: growth rate over the run and whether the second half is still climbing.
+
+    Startup allocation and filling bounded buffers show up early and then level
+    off, so only a slope that persists through the second half of the samples
+    is flagged; it must add more than tolerance of the starting value (and more
+    than the metric's floor) when extrapolated over the whole window. Bounded
+    buffers are flagged only if they ever exceed their bound.
+    """
+    report = {}
+    bounds = set(BOUNDED.values())
+    names = sorted({name for sample in samples for name in sample if name != 't' and name not in bounds})
+    for name in names:
+        points = [(sample['t'], sample[name]) for sample in samples if sample.get(name) is not None]
+        if len(points) < 4:
+            continue
+        late = points[len(points) // 2:]
+        overall, recent = slope(points), slope(late)
+        start = points[0][1]
+        projected = recent * window
+        leaking = (name in WATCHED and projected > max(WATCHED[name], tolerance * start))
+        if name in BOUNDED:
+            leaking = any(value > sample.get(BOUNDED[name], float('inf'))
+                          for sample in samples for value in [sample.get(name)] if value is not None)
+        report[name] = {
+            'start': start,
+            'end': points[-1][1],
+            'max': max(value for _, value in points),
+            'per_hour': round(overall * 3600, 3),
+            'late_per_hour': round(recent * 3600, 3),
+            'flagged': leaking,
+            'expected': name in EXPECTED_GROWTH
+        }
+    return report
+
+async def memory(session, url, **params):
+    """The server's /debug/memory sample, or None when it runs without TRAFFIC_DEBUG_MEMORY"""
+    async with session.get(url + '/debug/memory', params={k: str(v) for k, v in params.items()}) as response:
+        if response.status != 200:
+            return None
+        return await response.json()
+
+async def drive(session, name, url, rate, end, junctions, rng, counts):
+    """Poisson mix of the calls a dashboard makes: switches, crossings, status and log polls"""
+    calls = [('POST', '/api/control_vehicle', 6), ('GET', '/api/status', 2), ('GET', '/api/logs', 1)]
+    if name == 'enhanced':
+        calls.append(('POST', '/api/control_pedestrian', 3))
+    weights = [weight for _, _, weight in calls]
+    tasks = set()
+
+    async def call(method, path):
+        junction_id = f'soak-{rng.randrange(junctions)}'
+        body = {'junction_id': junction_id}
+        if path == '/api/control_vehicle':
+            body['road_id'] = random_road(rng)
+        elif path == '/api/control_pedestrian':
+            body['crossing_id'] = rng.randint(1, 2)
+        try:
+            if method == 'POST':
+                request = session.post(url + path, json=body)
+            else:
+                request = session.get(url + path, params={'junction_id': junction_id})
+            async with request as response:
+                await response.read()
+                counts['errors'] += response.status >= 400
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            counts['errors'] += 1
+        counts['requests'] += 1
+
+    # Reads of a junction that does not exist yet are 404s, so create every junction first
+    for index in range(junctions):
+        async with session.post(url + '/api/control_vehicle', json={'junction_id': f'soak-{index}', 'road_id': 1}) as response:
+            await response.read()
+
+    due = time.monotonic()
+    while True:
+        due += rng.expovariate(rate)
+        if due >= end:
+            break
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        method, path, _ = rng.choices(calls, weights)[0]
+        task = asyncio.ensure_future(call(method, path))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.wait(tasks)
+
+async def sample(session, url, started, traced):
+    gauges = await scrape_gauges(session, url)
+    point = {'t': round(time.monotonic() - started, 3)}
+    for name in list(WATCHED) + list(EXPECTED_GROWTH) + list(BOUNDED) + list(BOUNDED.values()):
+        if name in gauges:
+            point[name] = gauges[name]
+    if traced:
+        probe = await memory(session, url, limit=0)
+        point['traced_bytes'] = probe['traced_bytes'] if probe else None
+    return point
+
+async def soak(name, url, args, seed):
+    rng = random.Random(seed)
+    counts = {'requests': 0, 'errors': 0}
+    samples = []
+    timeout = aiohttp.ClientTimeout(total=120)  # tracemalloc snapshots of a big heap take a while
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0), timeout=timeout) as session:
+        traced = await memory(session, url, limit=0) is not None
+        started = time.monotonic()
+        warm_at = started + args.warmup
+        end = started + args.duration
+        driver = asyncio.ensure_future(drive(session, name, url, args.rate, end, args.junctions, rng, counts))
+        warmed = False
+        while time.monotonic() < end:
+            await asyncio.sleep(min(args.interval, max(0.0, end - time.monotonic())))
+            if not warmed and time.monotonic() >= warm_at:
+                warmed = True
+                if traced:
+                    await memory(session, url, reset=1, limit=0)  # Grown sites are measured from here
+                samples.clear()
+            samples.append(await sample(session, url, started, traced))
+            if args.verbose:
+                print(f"🧫 [{name}] {json.dumps(samples[-1])}")
+        await driver
+        sites = (await memory(session, url, limit=args.top))['growth'] if traced else None
+    window = samples[-1]['t'] - samples[0]['t'] if len(samples) > 1 else 0.0
+    report = trends(samples, window, args.tolerance)
+    return {
+        'server': name,
+        'url': url,
+        'requests': counts['requests'],
+        'errors': counts['errors'],
+        'tracemalloc': traced,
+        'trends': report,
+        'flagged': sorted(metric for metric, trend in report.items() if trend['flagged']),
+        'grown_allocation_sites': sites,
+        'samples': samples
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Soak the traffic servers and flag growth trends')
+    parser.add_argument('--servers', default='enhanced,auto', help='servers to spawn, comma separated')
+    parser.add_argument('--url', action='append', help='soak an already running server instead (repeatable)')
+    parser.add_argument('--port', type=int, default=5060, help='first port for spawned servers')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='spawn servers in asyncio mode')
+    parser.add_argument('--duration', default='6h', help='e.g. 90s, 30m, 6h')
+    parser.add_argument('--rate', type=float, default=20.0, help='requests per second per server')
+    parser.add_argument('--interval', default='60s', help='time between samples')
+    parser.add_argument('--warmup', default=None, help='discarded start of the run (default 5%%, at least one interval)')
+    parser.add_argument('--junctions', type=int, default=32)
+    parser.add_argument('--tolerance', type=float, default=0.10, help='flag growth above this fraction of start')
+    parser.add_argument('--top', type=int, default=15, help='allocation sites to report')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='print every sample')
+    parser.add_argument('--output', default='soak_report.json')
+    args = parser.parse_args()
+    args.duration = parse_duration(args.duration)
+    args.interval = parse_duration(args.interval)
+    args.warmup = parse_duration(args.warmup) if args.warmup else max(args.duration * 0.05, args.interval)
+
+    raise_fd_limit()
+    processes = []
+    targets = []
+    if args.url:
+        targets = [(url, url.rstrip('/')) for url in args.url]
+    else:
+        for offset, name in enumerate(name.strip() for name in args.servers.split(',') if name.strip()):
+            port = args.port + offset
+            processes.append(spawn_server(name, port, args.use_async, {'TRAFFIC_DEBUG_MEMORY': '1'}))
+            targets.append((name, f'http://127.0.0.1:{port}'))
+    try:
+        for (_, url), process in zip(targets, processes + [None] * len(targets)):
+            asyncio.run(wait_until_up(url, process))
+        print(f"🧫 Soaking {', '.join(name for name, _ in targets)} for {args.duration:g}s at {args.rate:g} req/s each...")
+
+        async def run_all():
+            return await asyncio.gather(*(soak(name, url, args, args.seed + index)
+                                          for index, (name, url) in enumerate(targets)))
+        results = asyncio.run(run_all())
+    finally:
+        for process in processes:
+            stop_server(process)
+
+    for result in results:
+        status = '❌ growth in ' + ', '.join(result['flagged']) if result['flagged'] else '✅ no sustained growth'
+        print(f"🧫 [{result['server']}] {result['requests']} requests, {result['errors']} errors: {status}")
+        for site in (result['grown_allocation_sites'] or [])[:5]:
+            print(f"   +{site['size_diff_bytes'] / 1024:.1f} KiB ({site['count_diff']:+d} blocks) {site['site']}")
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'meta': {
+                'servers': [name for name, _ in targets],
+                'async': args.use_async,
+                'duration_s': args.duration,
+                'rate': args.rate,
+                'interval_s': args.interval,
+                'warmup_s': args.warmup,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'started': time.strftime('%Y-%m-%d %H:%M:%S')
+            },
+            'results': results
+        }, f, indent=2)
+    print(f"📄 Report written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# 🔢 State Codec - junction signals packed as 2-bit colour codes
+
+import struct
+
+FORMAT_VERSION = 1
+SIGNALS = ('road1', 'road2', 'pedestrian1', 'pedestrian2')
+COLOURS = ('RED', 'YELLOW', 'GREEN')
+COLOUR_CODES = {colour: code for code, colour in enumerate(COLOURS)}
+
+HEADER = struct.Struct('<BH')   # format version, junction count
+ID_LENGTH = struct.Struct('<H')  # UTF-8 length of the junction id that follows
+RECORD = struct.Struct('<IB')   # state version, packed signals
+
+def pack_signals(state):
+    """Four signals in one byte: bits 0-1 road1, 2-3 road2, 4-5 pedestrian1, 6-7 pedestrian2"""
+    packed = 0
+    for index, signal in enumerate(SIGNALS):
+        packed |= COLOUR_CODES[state[signal]] << (2 * index)
+    return packed
+
+def unpack_signals(packed):
+    return {signal: COLOURS[(packed >> (2 * index)) & 3] for index, signal in enumerate(SIGNALS)}
+
+def encode_states(snapshots):
+    """One binary frame for a batch of junction snapshots"""
+    parts = [HEADER.pack(FORMAT_VERSION, len(snapshots))]
+    for snapshot in snapshots:
+        junction_id = snapshot['junction_id'].encode('utf-8')
+        parts.append(ID_LENGTH.pack(len(junction_id)))
+        parts.append(junction_id)
+        parts.append(RECORD.pack(snapshot['version'], pack_signals(snapshot)))
+    return b''.join(parts)
+
+def decode_states(data):
+    """Inverse of encode_states: a list of snapshot dicts"""
+    format_version, count = HEADER.unpack_from(data)
+    if format_version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported state frame format {format_version}")
+    offset = HEADER.size
+    states = []
+    for _ in range(count):
+        (length,) = ID_LENGTH.unpack_from(data, offset)
+        offset += ID_LENGTH.size
+        junction_id = bytes(data[offset:offset + length]).decode('utf-8')
+        offset += length
+        version, packed = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        state = unpack_signals(packed)
+        state['junction_id'] = junction_id
+        state['version'] = version
+        states.append(state)
+    return states
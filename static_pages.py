@@ -0,0 +1,94 @@
+# 🗜️ Static Pages - rendered once, stored precompressed, served with strong ETags
+
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:  # Optional: without it pages are served as gzip or identity
+    brotli = None
+
+VENDOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vendor')
+SOCKETIO_CLIENT = 'socket.io-4.8.1.min.js'
+SOCKETIO_CLIENT_PATH = '/vendor/' + SOCKETIO_CLIENT
+
+HTML = 'text/html; charset=utf-8'
+JAVASCRIPT = 'application/javascript; charset=utf-8'
+REVALIDATE = 'no-cache'  # Pages: always revalidate, usually answered with 304
+IMMUTABLE = 'public, max-age=31536000, immutable'  # Versioned file names never change
+
+class StaticAsset:
+    """One response body held in every encoding we offer, each with its own ETag"""
+    __slots__ = ('content_type', 'cache_control', 'variants')
+
+    def __init__(self, body, content_type, cache_control):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.content_type = content_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {'identity': (f'"{digest}"', body)}
+        if brotli is not None:
+            self.variants['br'] = (f'"{digest}-br"', brotli.compress(body, quality=11))
+        self.variants['gzip'] = (f'"{digest}-gz"', gzip.compress(body, 9, mtime=0))
+
+    def select(self, accept_encoding):
+        """Smallest variant the client accepts: (encoding, etag, body)"""
+        accepted = set()
+        for item in (accept_encoding or '').split(','):
+            token, _, params = item.strip().partition(';')
+            if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                continue
+            accepted.add(token.strip().lower())
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and (encoding in accepted or '*' in accepted):
+                return (encoding,) + self.variants[encoding]
+        return ('identity',) + self.variants['identity']
+
+class StaticPages:
+    """Path -> precomputed response, independent of the web framework serving it"""
+
+    def __init__(self):
+        self._assets = {}
+
+    def add(self, path, body, content_type=HTML, cache_control=REVALIDATE):
+        self._assets[path] = StaticAsset(body, content_type, cache_control)
+
+    def add_file(self, path, filename, content_type, cache_control=IMMUTABLE):
+        """Load a file from disk once; returns False if it is missing"""
+        try:
+            with open(filename, 'rb') as f:
+                body = f.read()
+        except OSError:
+            return False
+        self.add(path, body, content_type, cache_control)
+        return True
+
+    def add_socketio_client(self):
+        if not self.add_file(SOCKETIO_CLIENT_PATH, os.path.join(VENDOR_DIR, SOCKETIO_CLIENT), JAVASCRIPT):
+            print(f"⚠️ {SOCKETIO_CLIENT} not found in {VENDOR_DIR}; dashboards cannot load Socket.IO")
+
+    def paths(self):
+        return list(self._assets)
+
+    def respond(self, path, request_headers):
+        """(status, headers, body) for a GET of path, honouring Accept-Encoding and If-None-Match"""
+        asset = self._assets.get(path)
+        if asset is None:
+            return 404, {}, b''
+        encoding, etag, body = asset.select(request_headers.get('Accept-Encoding'))
+        headers = {
+            'ETag': etag,
+            'Cache-Control': asset.cache_control,
+            'Vary': 'Accept-Encoding'
+        }
+        if_none_match = request_headers.get('If-None-Match')
+        if if_none_match:
+            tags = [tag.strip().replace('W/', '', 1) for tag in if_none_match.split(',')]
+            if etag in tags or '*' in tags:
+                return 304, headers, b''
+        headers['Content-Type'] = asset.content_type
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return 200, headers, body
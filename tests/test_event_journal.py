@@ -0,0 +1,67 @@
+# 🧪 Event Journal - appends, recovery across segment boundaries, the directory lock
+
+import pytest
+from event_journal import EventJournal, JUNCTION_ID_BYTES
+
+def log(index, junction_id='main'):
+    return ('VEHICLE', f'Switch {index}', f'message {index}', index % 2 == 0, junction_id, 0)
+
+def open_journal(directory, segment_records=4):
+    return EventJournal(str(directory), fsync_ms=1000, segment_records=segment_records)
+
+def test_append_spans_segments_and_recovers(tmp_path):
+    journal = open_journal(tmp_path)
+    assert journal.append_logs([log(i) for i in range(1, 7)]) == 6  # One batch across a boundary
+    assert journal.append_logs([log(7)]) == 7
+    journal.close()
+
+    journal = open_journal(tmp_path)
+    assert journal.last_seq == 7
+    assert journal.stats()['segments'] == 2
+    assert [entry['action'] for entry in journal.page(0, 10)] == [f'Switch {i}' for i in range(1, 8)]
+    assert journal.append_logs([log(8)]) == 8
+    journal.close()
+
+def test_recovers_when_the_last_segment_is_exactly_full(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.append_logs([log(i) for i in range(1, 9)])
+    journal.close()
+
+    journal = open_journal(tmp_path)
+    assert journal.last_seq == 8
+    assert journal.append_logs([log(9)]) == 9
+    assert journal.entry(9)['action'] == 'Switch 9'
+    assert journal.entry(4)['success'] is True
+    journal.close()
+
+def test_state_records_round_trip(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.append_state({'junction_id': 'north', 'version': 3,
+                          'road1': 'GREEN', 'road2': 'RED', 'pedestrian1': 'RED', 'pedestrian2': 'YELLOW'})
+    entry = journal.entry(1)
+    assert entry['kind'] == 'state'
+    assert entry['junction_id'] == 'north'
+    assert entry['version'] == 3
+    assert entry['signals'] == {'road1': 'GREEN', 'road2': 'RED', 'pedestrian1': 'RED', 'pedestrian2': 'YELLOW'}
+    journal.close()
+
+def test_timestamps_never_go_backwards(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.append_logs([log(1)[:5] + (2000,), log(2)[:5] + (1000,)])
+    assert [entry['ts_ns'] for entry in journal.page(0, 2)] == [2000, 2000]
+    journal.close()
+
+def test_second_writer_is_refused(tmp_path):
+    journal = open_journal(tmp_path)
+    with pytest.raises(RuntimeError):
+        open_journal(tmp_path)
+    journal.close()
+    open_journal(tmp_path).close()
+
+def test_long_junction_ids_are_refused_not_cut(tmp_path):
+    journal = open_journal(tmp_path)
+    with pytest.raises(ValueError):
+        journal.append_logs([log(1, 'x' * (JUNCTION_ID_BYTES + 1))])
+    journal.append_logs([log(1, 'é' * (JUNCTION_ID_BYTES // 2))])
+    assert journal.entry(1)['junction_id'] == 'é' * (JUNCTION_ID_BYTES // 2)
+    journal.close()
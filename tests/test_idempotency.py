@@ -0,0 +1,116 @@
+# 🧪 Idempotency - replays, in-flight retries, failures and eviction
+
+import threading
+import pytest
+import idempotency
+from idempotency import FIELD, IdempotencyCache
+from request_errors import RequestError
+
+class Counted:
+    """A handler that counts its calls and returns the call number"""
+
+    def __init__(self, name='control_vehicle_rpc'):
+        self.calls = 0
+        self.__name__ = name
+
+    def __call__(self, data):
+        self.calls += 1
+        return {'success': True, 'call': self.calls, 'road_id': data.get('road_id')}
+
+def keyed(key, **params):
+    return dict(params, **{FIELD: key})
+
+def test_retry_replays_the_first_response():
+    cache = IdempotencyCache()
+    handler = Counted()
+    wrapped = cache.idempotent(handler)
+    first = wrapped(keyed('k', road_id=1))
+    assert wrapped(keyed('k', road_id=1)) is first
+    assert handler.calls == 1
+    assert (cache.replays, cache.misses) == (1, 1)
+
+def test_requests_without_a_key_always_run():
+    handler = Counted()
+    wrapped = IdempotencyCache().idempotent(handler)
+    wrapped({'road_id': 1})
+    wrapped({'road_id': 1})
+    assert handler.calls == 2
+
+def test_keys_are_scoped_per_handler():
+    cache = IdempotencyCache()
+    vehicle, pedestrian = Counted('control_vehicle_rpc'), Counted('control_pedestrian_rpc')
+    cache.idempotent(vehicle)(keyed('k', road_id=1))
+    cache.idempotent(pedestrian)(keyed('k', road_id=1))
+    assert (vehicle.calls, pedestrian.calls) == (1, 1)
+
+def test_reusing_a_key_for_another_body_is_a_422():
+    wrapped = IdempotencyCache().idempotent(Counted())
+    wrapped(keyed('k', road_id=1))
+    with pytest.raises(RequestError) as error:
+        wrapped(keyed('k', road_id=2))
+    assert error.value.status == 422
+
+def test_retry_waits_for_the_request_in_flight():
+    cache = IdempotencyCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow(data):
+        calls.append(data)
+        started.set()
+        release.wait(5)
+        return {'success': True}
+    slow.__name__ = 'slow_rpc'
+    wrapped = cache.idempotent(slow)
+    responses = []
+    first = threading.Thread(target=lambda: responses.append(wrapped(keyed('k'))))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: responses.append(wrapped(keyed('k'))))
+    second.start()
+    second.join(0.1)
+    assert second.is_alive()  # Parked behind the first attempt
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert len(calls) == 1
+    assert responses[0] is responses[1]
+
+def test_a_failed_attempt_is_not_cached():
+    attempts = []
+
+    def flaky(data):
+        attempts.append(data)
+        if len(attempts) == 1:
+            raise RuntimeError('junction unavailable')
+        return {'success': True}
+    flaky.__name__ = 'flaky_rpc'
+    wrapped = IdempotencyCache().idempotent(flaky)
+    with pytest.raises(RuntimeError):
+        wrapped(keyed('k'))
+    assert wrapped(keyed('k')) == {'success': True}
+    assert len(attempts) == 2
+
+def test_keys_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(idempotency.time, 'monotonic', lambda: now[0])
+    handler = Counted()
+    wrapped = IdempotencyCache(ttl_s=10).idempotent(handler)
+    wrapped(keyed('k', road_id=1))
+    now[0] += 9
+    wrapped(keyed('k', road_id=1))
+    assert handler.calls == 1
+    now[0] += 2
+    assert wrapped(keyed('k', road_id=2))['call'] == 2  # Expired, so a new body is fine too
+
+def test_oldest_keys_are_evicted_beyond_capacity():
+    cache = IdempotencyCache(capacity=2)
+    handler = Counted()
+    wrapped = cache.idempotent(handler)
+    for key in ('a', 'b', 'c'):
+        wrapped(keyed(key))
+    assert cache.stats()['keys'] == 2
+    wrapped(keyed('c'))
+    assert handler.calls == 3
+    wrapped(keyed('a'))
+    assert handler.calls == 4
@@ -0,0 +1,43 @@
+# 🧪 Log Export - NDJSON/CSV streams over the journal
+
+import csv
+import gzip
+import io
+import json
+import pytest
+from event_journal import EventJournal
+from log_export import ExportStream
+from log_index import LogIndex
+from request_errors import RequestError
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = EventJournal(str(tmp_path), fsync_ms=1000)
+    index = LogIndex()
+    journal.subscribe(index.add)
+    journal.append_logs([('VEHICLE' if i % 2 else 'PEDESTRIAN', f'action {i}', f'message {i}', True, 'main', 0)
+                         for i in range(1, 6)])
+    journal.index = index
+    yield journal
+    journal.close()
+
+def body(stream, accept_encoding=None):
+    headers, chunks = stream.open(accept_encoding)
+    data = b''.join(chunks)
+    return headers, gzip.decompress(data) if headers.get('Content-Encoding') == 'gzip' else data
+
+def test_ndjson_resumes_from_the_cursor(journal):
+    headers, data = body(ExportStream(journal, journal.index, {}, cursor=2))
+    assert headers['X-Export-End-Seq'] == '5'
+    assert [json.loads(line)['seq'] for line in data.splitlines()] == [3, 4, 5]
+
+def test_csv_with_filters_and_gzip(journal):
+    headers, data = body(ExportStream(journal, journal.index, {'log_type': 'VEHICLE'}, fmt='csv'), 'gzip, br')
+    assert headers['Content-Encoding'] == 'gzip'
+    rows = list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+    assert [row['seq'] for row in rows] == ['1', '3', '5']
+
+def test_unknown_format_is_a_bad_request(journal):
+    with pytest.raises(RequestError) as error:
+        ExportStream(journal, journal.index, {}, fmt='xml')
+    assert error.value.status == 400
@@ -0,0 +1,51 @@
+# 🧪 Log Index - filters, cursors and page limits
+
+import pytest
+from log_index import LogIndex, parse_filters
+from request_errors import RequestError
+
+@pytest.fixture
+def index():
+    index = LogIndex()
+    for seq in range(1, 11):  # Odd seqs VEHICLE, even PEDESTRIAN; every third one failed
+        index.add(seq, seq * 1000, 'VEHICLE' if seq % 2 else 'PEDESTRIAN', f'action {seq % 2}', seq % 3 != 0)
+    return index
+
+def test_pages_resume_from_the_cursor(index):
+    seqs, cursor, more = index.query(limit=4)
+    assert (seqs, cursor, more) == ([1, 2, 3, 4], 4, True)
+    seqs, cursor, more = index.query(cursor=cursor, limit=4)
+    assert (seqs, cursor, more) == ([5, 6, 7, 8], 8, True)
+    seqs, cursor, more = index.query(cursor=cursor, limit=4)
+    assert (seqs, cursor, more) == ([9, 10], 10, False)
+
+def test_limit_is_at_least_one(index):
+    assert index.query(limit=0)[0] == [1]
+    assert index.query(limit=-5)[0] == [1]
+
+def test_filters_combine(index):
+    assert index.query(log_type='VEHICLE')[0] == [1, 3, 5, 7, 9]
+    assert index.query(log_type='VEHICLE', success=False)[0] == [3, 9]
+    assert index.query(action='action 0', start_ns=4000, end_ns=8000)[0] == [4, 6, 8]
+
+def test_filtered_cursor_skips_what_was_examined(index):
+    seqs, cursor, more = index.query(log_type='PEDESTRIAN', limit=2)
+    assert (seqs, cursor, more) == ([2, 4], 4, True)
+    seqs, cursor, more = index.query(log_type='PEDESTRIAN', cursor=cursor, limit=10)
+    assert (seqs, cursor, more) == ([6, 8, 10], 10, False)
+
+def test_unknown_values_match_nothing(index):
+    assert index.query(log_type='SYSTEM') == ([], 10, False)
+    assert index.query(action='nothing', cursor=3) == ([], 10, False)
+
+def test_new_events_after_the_last_page_are_found(index):
+    cursor = index.query(limit=100)[1]
+    index.add(11, 11000, 'VEHICLE', 'action 1', True)
+    assert index.query(cursor=cursor)[0] == [11]
+
+def test_parse_filters():
+    filters = parse_filters({'type': 'vehicle', 'success': 'false', 'from': '1.5'})
+    assert filters == {'log_type': 'VEHICLE', 'success': False, 'start_ns': 1_500_000_000}
+    with pytest.raises(RequestError) as error:
+        parse_filters({'to': 'yesterday'})
+    assert error.value.status == 400
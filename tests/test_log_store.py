@@ -0,0 +1,71 @@
+# 🧪 Log Store - sequence numbers, deltas and resets
+
+from log_store import LogRing
+
+def fill(ring, count):
+    return [ring.append('SYSTEM', f'action {i}', 'message') for i in range(count)]
+
+def seqs(entries):
+    return [entry['seq'] for entry in entries]
+
+def test_delta_returns_only_missed_entries():
+    ring = LogRing(10)
+    fill(ring, 5)
+    entries, reset = ring.delta(3, 100)
+    assert (seqs(entries), reset) == ([4, 5], False)
+    assert ring.delta(5, 100) == ([], False)
+
+def test_delta_resets_after_entries_were_overwritten():
+    ring = LogRing(5)
+    fill(ring, 9)
+    entries, reset = ring.delta(2, 100)
+    assert (seqs(entries), reset) == ([5, 6, 7, 8, 9], True)
+
+def test_delta_resets_a_client_holding_cleared_entries():
+    ring = LogRing(5)
+    fill(ring, 3)
+    ring.clear()
+    fill(ring, 1)
+    entries, reset = ring.delta(3, 100)
+    assert (seqs(entries), reset) == ([4], True)
+    assert ring.delta(4, 100) == ([], False)
+
+def test_delta_resets_a_seq_the_ring_never_issued():
+    ring = LogRing(10)
+    fill(ring, 3)
+    entries, reset = ring.delta(500, 100)  # A dashboard from before a restart
+    assert (seqs(entries), reset) == ([1, 2, 3], True)
+
+def test_every_ring_has_its_own_epoch():
+    assert LogRing(5).epoch != LogRing(5).epoch
+
+def test_ring_keeps_only_the_newest_capacity_entries():
+    ring = LogRing(4)
+    fill(ring, 6)
+    assert (ring.first_seq, ring.last_seq, len(ring)) == (3, 6, 4)
+    assert seqs(ring.tail(10)) == [3, 4, 5, 6]
+    assert seqs(ring.tail(2)) == [5, 6]
+
+def test_since_respects_the_limit_and_the_oldest_entry():
+    ring = LogRing(4)
+    fill(ring, 6)
+    assert seqs(ring.since(0)) == [3, 4, 5, 6]
+    assert seqs(ring.since(3, limit=2)) == [4, 5]
+    assert ring.since(6) == []
+
+def test_entries_round_trip_their_fields():
+    ring = LogRing(4)
+    seqs_added = ring.extend([('VEHICLE', 'Switch', 'done', True, 'north', 2_000_000_000),
+                              ('PEDESTRIAN', 'Cross', 'denied', False, None, 3_000_000_000)])
+    assert seqs_added == [1, 2]
+    first, second = ring.since(0)
+    assert (first['type'], first['action'], first['message'], first['junction_id']) == ('VEHICLE', 'Switch', 'done', 'north')
+    assert first['ts_ns'] == 2_000_000_000 and first['status'] == '✅ SUCCESS'
+    assert (second['success'], second['junction_id'], second['status']) == (False, None, '❌ ERROR')
+
+def test_clear_keeps_sequence_numbers_increasing():
+    ring = LogRing(4)
+    fill(ring, 3)
+    ring.clear()
+    assert len(ring) == 0 and ring.tail(10) == []
+    assert fill(ring, 1) == [4]
@@ -0,0 +1,55 @@
+# 🧪 Long Poll - waiting for a junction's version to move
+
+import asyncio
+import threading
+import time
+from junction_registry import JunctionRegistry
+from long_poll import MAX_TIMEOUT, LongPoll
+
+INITIAL_STATE = {'road1': 'RED', 'road2': 'GREEN', 'pedestrian1': 'RED', 'pedestrian2': 'RED'}
+
+def poll(junction, since, timeout):
+    return LongPoll(junction, since, timeout, lambda: {'version': junction.version})
+
+def change(junction):
+    with junction.lock:
+        junction.commit()
+    junction.notify()
+
+def test_answers_at_once_when_the_version_already_moved():
+    junction = JunctionRegistry(INITIAL_STATE).get()
+    assert poll(junction, 0, 10).wait() == {'version': 1}
+
+def test_unchanged_after_the_timeout_is_none():
+    junction = JunctionRegistry(INITIAL_STATE).get()
+    started = time.monotonic()
+    assert poll(junction, junction.version, 0.05).wait() is None
+    assert time.monotonic() - started >= 0.05
+
+def test_thread_wakes_on_the_next_change():
+    junction = JunctionRegistry(INITIAL_STATE).get()
+    timer = threading.Timer(0.05, change, (junction,))
+    timer.start()
+    started = time.monotonic()
+    assert poll(junction, 1, 5).wait() == {'version': 2}
+    assert time.monotonic() - started < 2
+    assert junction._waiters == []
+
+def test_coroutine_wakes_on_a_change_from_another_thread():
+    junction = JunctionRegistry(INITIAL_STATE).get()
+
+    async def main():
+        threading.Timer(0.05, change, (junction,)).start()
+        return await poll(junction, 1, 5).wait_async()
+    assert asyncio.run(main()) == {'version': 2}
+    assert junction._waiters == []
+
+def test_coroutine_times_out_to_none():
+    junction = JunctionRegistry(INITIAL_STATE).get()
+    assert asyncio.run(poll(junction, 1, 0.05).wait_async()) is None
+
+def test_timeout_is_clamped():
+    junction = JunctionRegistry(INITIAL_STATE).get()
+    assert poll(junction, 1, 3600).timeout == MAX_TIMEOUT
+    assert poll(junction, 1, -5).timeout == 0.0
+    assert poll(junction, 1, -5).wait() is None  # No timeout: answer straight away
@@ -0,0 +1,32 @@
+# 🧪 Metrics - histograms and timed locks
+
+from metrics import Histogram, TimedLock, merged
+
+def test_timed_lock_records_after_release():
+    lock = TimedLock()
+    with lock:
+        assert lock.locked()
+        assert lock.wait.count == 0 and lock.hold.count == 0  # Nothing recorded while held
+    assert lock.wait.count == 1 and lock.hold.count == 1
+
+def test_timed_locks_do_not_share_histograms():
+    first, second = TimedLock(), TimedLock()
+    with first:
+        pass
+    assert second.wait.count == 0
+    assert first.wait is not second.wait
+
+def test_merged_adds_up_every_histogram():
+    histograms = [Histogram() for _ in range(3)]
+    for index, histogram in enumerate(histograms):
+        histogram.record(1000 * (index + 1))
+    total = merged(histograms)
+    assert (total.count, total.total, total.max) == (3, 6000, 3000)
+    assert merged([]).count == 0
+
+def test_percentiles_stay_within_the_bucket_error():
+    histogram = Histogram()
+    for value in range(1, 10001):
+        histogram.record(value)
+    assert abs(histogram.percentile(50) - 5000) <= 5000 * 0.07
+    assert histogram.percentile(100) == 10000
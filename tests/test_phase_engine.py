@@ -0,0 +1,92 @@
+# 🧪 Phase Engine - coalescing, busy channels and failed phases
+
+import pytest
+from junction_registry import JunctionRegistry
+from phase_engine import CROSSING, VEHICLE, PhaseEngine
+from phase_plans import ENHANCED_PLAN
+from sim_clock import VirtualClock, VirtualScheduler
+
+INITIAL_STATE = {'road1': 'RED', 'road2': 'GREEN', 'pedestrian1': 'RED', 'pedestrian2': 'RED'}
+
+class Rig:
+    def __init__(self, plan=ENHANCED_PLAN):
+        self.clock = VirtualClock()
+        self.scheduler = VirtualScheduler(self.clock)
+        self.registry = JunctionRegistry(INITIAL_STATE, clock=self.clock.time)
+        self.published = []
+        self.logs = []
+        self.engine = PhaseEngine(plan, lambda: self.scheduler,
+                                  lambda snapshot, committed_ns: self.published.append(snapshot), self.log)
+        self.junction = self.registry.get()
+
+    def log(self, *args, **kwargs):
+        self.logs.append((args, kwargs))
+
+    def start(self, kind, target):
+        with self.junction.lock:
+            return self.engine.start(self.junction, kind, target, self.log)
+
+@pytest.fixture
+def rig():
+    return Rig()
+
+def test_switch_runs_every_phase_and_finishes(rig):
+    result = rig.start(VEHICLE, 1)
+    assert result['success'] and result['transition']['in_flight']
+    rig.scheduler.run()
+    assert rig.junction.state['road1'] == 'GREEN' and rig.junction.state['road2'] == 'RED'
+    assert [snapshot['version'] for snapshot in rig.published] == [2, 3, 4]
+    transition = rig.junction.transitions['vehicle']
+    assert not transition.in_flight and transition.step == 2
+
+def test_repeat_joins_the_transition_in_flight(rig):
+    first = rig.start(VEHICLE, 1)
+    second = rig.start(VEHICLE, '1')
+    assert second['success']
+    assert second['transition']['transition_id'] == first['transition']['transition_id']
+    assert second['transition']['attached'] == 1
+    rig.scheduler.run()
+    assert len(rig.published) == 3  # One sequence, not two
+
+def test_other_target_is_busy_while_a_switch_runs(rig):
+    rig.start(VEHICLE, 1)
+    busy = rig.start(VEHICLE, 2)
+    assert not busy['success']
+    assert busy['message'] == 'Switch to Road 1 is in progress'
+    assert busy['transition']['target'] == 1
+
+def test_guard_refuses_once_the_switch_is_done(rig):
+    rig.start(VEHICLE, 1)
+    rig.scheduler.run()
+    refused = rig.start(VEHICLE, 1)
+    assert not refused['success'] and refused['message'] == 'Road 1 is already GREEN'
+    assert rig.start(VEHICLE, 2)['success']
+
+def test_channels_are_independent(rig):
+    assert rig.start(CROSSING, 1)['success']
+    assert rig.start(VEHICLE, 1)['success']
+    assert set(rig.junction.transitions) == {'crossing1', 'vehicle'}
+
+def test_a_failing_phase_finishes_its_transition(rig):
+    publish = rig.engine._publish
+    failures = []
+
+    def fail_once(snapshot, committed_ns):
+        if not failures:
+            failures.append(snapshot)
+            raise RuntimeError('publisher gone')
+        publish(snapshot, committed_ns)
+    rig.engine._publish = fail_once
+    rig.start(VEHICLE, 1)
+    rig.scheduler.run()
+    transition = rig.junction.transitions['vehicle']
+    assert not transition.in_flight and transition.step == -1
+    assert not rig.junction.lock.locked()
+    assert rig.start(VEHICLE, 1)['success']  # The channel is free again
+
+def test_phases_run_with_the_junction_lock_held(rig):
+    held = []
+    rig.engine._publish = lambda snapshot, committed_ns: held.append(rig.junction.lock.locked())
+    rig.start(VEHICLE, 1)
+    rig.scheduler.run()
+    assert held == [True, True, True]
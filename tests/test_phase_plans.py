@@ -0,0 +1,55 @@
+# 🧪 Phase Plans - compiled commands, bad targets and derived signals
+
+import pytest
+from phase_engine import CROSSING, VEHICLE
+from phase_plans import AUTO_PLAN, ENHANCED_PLAN
+from request_errors import RequestError
+from test_phase_engine import Rig
+
+@pytest.mark.parametrize('target', [None, '', 'x', 0, 3, -1, 1.5j])
+def test_unknown_targets_are_bad_requests(target):
+    with pytest.raises(RequestError) as error:
+        ENHANCED_PLAN.command(VEHICLE, target)
+    assert error.value.status == 400
+    assert 'road_id' in error.value.message
+
+def test_a_plan_without_the_command_kind_refuses_it():
+    with pytest.raises(RequestError) as error:
+        AUTO_PLAN.command(CROSSING, 1)
+    assert 'crossing_id' in error.value.message
+
+def test_messages_are_rendered_per_target():
+    command = ENHANCED_PLAN.command(VEHICLE, '2')
+    assert command.target == 2
+    assert command.started == 'Traffic switch to Road 2 initiated successfully'
+    assert command.phase_names == ['vehicle_yellow', 'vehicle_clearance', 'vehicle_green']
+    assert command.phases[0][1].message == 'Road 1 changed to YELLOW (warning phase)'
+
+def test_auto_plan_derives_pedestrian_signals_with_the_green_phase():
+    rig = Rig(AUTO_PLAN)
+    rig.start(VEHICLE, 1)
+    rig.scheduler.run()
+    states = [{name: snapshot[name] for name in ('road1', 'road2', 'pedestrian1', 'pedestrian2')}
+              for snapshot in rig.published]
+    assert states == [
+        {'road1': 'RED', 'road2': 'YELLOW', 'pedestrian1': 'RED', 'pedestrian2': 'RED'},
+        {'road1': 'RED', 'road2': 'RED', 'pedestrian1': 'RED', 'pedestrian2': 'RED'},
+        {'road1': 'GREEN', 'road2': 'RED', 'pedestrian1': 'RED', 'pedestrian2': 'GREEN'}
+    ]
+
+def test_auto_plan_logs_rejections_as_successes():
+    rig = Rig(AUTO_PLAN)
+    assert not rig.start(VEHICLE, 2)['success']  # Road 2 starts GREEN
+    assert rig.logs[-1][1]['success'] is True
+    rig = Rig(ENHANCED_PLAN)
+    rig.start(VEHICLE, 2)
+    assert rig.logs[-1][1]['success'] is False
+
+def test_enhanced_crossing_walks_then_stops():
+    rig = Rig(ENHANCED_PLAN)
+    rig.start(CROSSING, 1)
+    rig.scheduler.run(until=1)
+    assert rig.junction.state['pedestrian1'] == 'GREEN'
+    rig.scheduler.run()
+    assert rig.junction.state['pedestrian1'] == 'RED'
+    assert rig.clock.monotonic() == 8
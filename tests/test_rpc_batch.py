@@ -0,0 +1,95 @@
+# 🧪 JSON-RPC Batches - errors, notifications and per-junction grouping
+
+import pytest
+from junction_registry import JunctionRegistry
+from rpc_batch import (INTERNAL_ERROR, INVALID_PARAMS, INVALID_REQUEST, METHOD_NOT_FOUND, PARSE_ERROR,
+                       execute_batch)
+
+INITIAL_STATE = {'road1': 'GREEN', 'road2': 'RED', 'pedestrian1': 'RED', 'pedestrian2': 'RED'}
+
+def echo(junction, params, log):
+    log('VEHICLE', 'Echo', 'echoed', success=True, junction_id=junction.junction_id)
+    return {'junction_id': junction.junction_id, 'value': params.get('value')}
+
+def bad_params(junction, params, log):
+    raise ValueError('value must be positive')
+
+def broken(junction, params, log):
+    raise RuntimeError('boom')
+
+def status(junction, params, log):
+    return junction.state
+
+METHODS = {'echo': echo, 'bad_params': bad_params, 'broken': broken, 'status': status}
+
+@pytest.fixture
+def run():
+    registry = JunctionRegistry(INITIAL_STATE)
+    commits = []
+
+    def run(payload):
+        return execute_batch(payload, registry, METHODS, lambda *args, **kwargs: args[:3], commits.append,
+                             read_only=('status',))
+    run.registry = registry
+    run.commits = commits
+    return run
+
+def call(method, call_id=None, **params):
+    request = {'jsonrpc': '2.0', 'method': method, 'params': params}
+    if call_id is not None:
+        request['id'] = call_id
+    return request
+
+def error_code(response):
+    return response['error']['code']
+
+def test_single_call(run):
+    assert run(call('echo', 1, value=3)) == {'jsonrpc': '2.0', 'id': 1, 'result': {'junction_id': 'main', 'value': 3}}
+
+def test_malformed_payloads(run):
+    assert error_code(run(None)) == PARSE_ERROR
+    assert error_code(run([])) == INVALID_REQUEST
+    assert error_code(run('echo')) == INVALID_REQUEST
+
+def test_errors_stay_with_their_call(run):
+    responses = run([
+        call('echo', 1, value=1),
+        call('missing', 2),
+        call('bad_params', 3),
+        call('broken', 4),
+        {'jsonrpc': '1.0', 'id': 5, 'method': 'echo'},
+        {'jsonrpc': '2.0', 'id': 6, 'method': 'echo', 'params': [1]},
+        call('echo', 7, value=7)
+    ])
+    assert [response['id'] for response in responses] == [1, 2, 3, 4, None, 6, 7]
+    assert responses[0]['result']['value'] == 1
+    assert error_code(responses[1]) == METHOD_NOT_FOUND
+    assert error_code(responses[2]) == INVALID_PARAMS
+    assert 'value must be positive' in responses[2]['error']['message']
+    assert error_code(responses[3]) == INTERNAL_ERROR
+    assert error_code(responses[4]) == INVALID_REQUEST
+    assert error_code(responses[5]) == INVALID_PARAMS
+    assert responses[6]['result']['value'] == 7
+
+def test_notifications_run_but_get_no_response(run):
+    assert run(call('echo', value=1)) is None
+    responses = run([call('echo', value=1), call('echo', 2, value=2), call('broken')])
+    assert [response['id'] for response in responses] == [2]
+    assert len(run.commits) == 2  # The notifications' log entries were still committed
+
+def test_logs_are_committed_once_per_batch(run):
+    run([call('echo', index, junction_id=f'j{index % 2}') for index in range(4)])
+    assert len(run.commits) == 1
+    assert len(run.commits[0]) == 4
+
+def test_reads_never_create_junctions(run):
+    response = run(call('status', 1, junction_id='typo'))
+    assert error_code(response) == INVALID_PARAMS
+    assert 'typo' not in run.registry.ids()
+    assert run(call('echo', 2, junction_id='north'))['result']['junction_id'] == 'north'
+    assert run(call('status', 3, junction_id='north'))['result']['road1'] == 'GREEN'
+
+def test_overlong_junction_ids_are_invalid_params(run):
+    responses = run([call('echo', 1, junction_id='x' * 40), call('echo', 2)])
+    assert error_code(responses[0]) == INVALID_PARAMS
+    assert responses[1]['result']['junction_id'] == 'main'
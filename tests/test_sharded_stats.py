@@ -0,0 +1,33 @@
+# 🧪 Sharded Stats - per-thread counters summed on read
+
+import threading
+from sharded_stats import ShardedCounters
+
+def test_counts_from_many_threads_are_exact():
+    counters = ShardedCounters(['total_requests', 'vehicle_requests'])
+    barrier = threading.Barrier(8)
+
+    def work():
+        barrier.wait()
+        for _ in range(10000):
+            counters.incr('total_requests')
+        counters.incr('vehicle_requests', 5)
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counters.snapshot() == {'total_requests': 80000, 'vehicle_requests': 40}
+
+def test_shards_of_finished_threads_are_folded_in():
+    counters = ShardedCounters(['total_requests'])
+    counters.incr('total_requests')
+    for _ in range(5):
+        thread = threading.Thread(target=counters.incr, args=('total_requests', 2))
+        thread.start()
+        thread.join()
+    assert counters.shard_count() == 6
+    assert counters.snapshot() == {'total_requests': 11}
+    assert counters.shard_count() == 1  # Only this thread's shard is still live
+    counters.incr('total_requests')
+    assert counters.snapshot() == {'total_requests': 12}
@@ -0,0 +1,35 @@
+# 🧪 State Codec - binary state frames
+
+import itertools
+import pytest
+from state_codec import COLOURS, SIGNALS, decode_states, encode_states, pack_signals, unpack_signals
+
+def test_every_colour_combination_packs_into_one_byte():
+    packed = set()
+    for colours in itertools.product(COLOURS, repeat=len(SIGNALS)):
+        state = dict(zip(SIGNALS, colours))
+        assert unpack_signals(pack_signals(state)) == state
+        packed.add(pack_signals(state))
+    assert len(packed) == len(COLOURS) ** len(SIGNALS) and max(packed) < 256
+
+def test_round_trip():
+    snapshots = [
+        {'junction_id': 'main', 'version': 1, 'road1': 'GREEN', 'road2': 'RED',
+         'pedestrian1': 'RED', 'pedestrian2': 'GREEN'},
+        {'junction_id': 'nörth-7', 'version': 2 ** 32 - 1, 'road1': 'YELLOW', 'road2': 'RED',
+         'pedestrian1': 'RED', 'pedestrian2': 'RED'}
+    ]
+    assert decode_states(encode_states(snapshots)) == snapshots
+
+def test_empty_batch():
+    assert decode_states(encode_states([])) == []
+
+def test_decodes_from_a_memoryview():
+    snapshot = dict({signal: COLOURS[0] for signal in SIGNALS}, junction_id='a', version=5)
+    assert decode_states(memoryview(encode_states([snapshot]))) == [snapshot]
+
+def test_unknown_format_is_refused():
+    data = bytearray(encode_states([]))
+    data[0] = 99
+    with pytest.raises(ValueError):
+        decode_states(bytes(data))
@@ -0,0 +1,40 @@
+# 🧪 Traffic Client - matching JSON-RPC batch responses to calls
+
+import pytest
+from rpc_batch import INTERNAL_ERROR, INVALID_REQUEST, PARSE_ERROR
+from traffic_client import RpcError, TrafficClient, batch_results
+
+def error(call_id, code, message='failed'):
+    return {'jsonrpc': '2.0', 'id': call_id, 'error': {'code': code, 'message': message}}
+
+def result(call_id, value):
+    return {'jsonrpc': '2.0', 'id': call_id, 'result': value}
+
+def test_results_come_back_in_call_order():
+    assert batch_results([1, 2], [result(2, 'b'), result(1, 'a')], True) == ['a', 'b']
+
+def test_a_single_error_object_fails_every_call():
+    results = batch_results([1, 2], error(None, PARSE_ERROR, 'Parse error'), False)
+    assert [(exc.code, exc.call_id) for exc in results] == [(PARSE_ERROR, 1), (PARSE_ERROR, 2)]
+    with pytest.raises(RpcError):
+        batch_results([1], error(None, PARSE_ERROR), True)
+
+def test_null_id_errors_stand_in_for_missing_responses():
+    results = batch_results([1, 2], [result(1, 'a'), error(None, INVALID_REQUEST)], False)
+    assert results[0] == 'a'
+    assert (results[1].code, results[1].call_id) == (INVALID_REQUEST, 2)
+
+def test_a_call_without_any_response_is_an_rpc_error():
+    results = batch_results([1, 2], [result(1, 'a')], False)
+    assert results[1].code == INTERNAL_ERROR
+    assert batch_results([1], None, False)[0].code == INTERNAL_ERROR
+
+def test_execute_uses_the_same_matching(monkeypatch):
+    client = TrafficClient()
+    monkeypatch.setattr(client, '_post', lambda path, body: error(None, PARSE_ERROR, 'Parse error'))
+    batch = client.batch()
+    batch.call('status')
+    with pytest.raises(RpcError) as exc:
+        client.execute(batch)
+    assert exc.value.code == PARSE_ERROR
+    client.close()
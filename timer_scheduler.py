@@ -0,0 +1,83 @@
+# ⏱️ Timer Scheduler - one thread runs every timed signal phase
+
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from metrics import Histogram
+
+class TimerScheduler:
+    """Heap-based timer thread.
+
+    Phase transitions are queued as (due time, callback) pairs and run by a
+    single daemon thread, so the thread count stays flat no matter how many
+    signal sequences are in flight.
+    """
+
+    def __init__(self, name='traffic-timers'):
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self.fired = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+        self.lag = Histogram()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def call_later(self, delay, callback, *args):
+        """Run callback(*args) on the timer thread after delay seconds"""
+        due = time.monotonic() + delay
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._counter), callback, args))
+            if self._heap[0][0] == due:
+                self._cond.notify()
+
+    def run_sequence(self, steps):
+        """Run (delay, callback, args) steps in order, each delay counted from the previous step"""
+        if steps:
+            delay, callback, args = steps[0]
+            self.call_later(delay, self._run_step, steps, 0)
+
+    def _run_step(self, steps, index):
+        _, callback, args = steps[index]
+        callback(*args)
+        if index + 1 < len(steps):
+            self.call_later(steps[index + 1][0], self._run_step, steps, index + 1)
+
+    def stats(self):
+        with self._cond:
+            depth = len(self._heap)
+        return {
+            'queue_depth': depth,
+            'timers_fired': self.fired,
+            'last_lag_ms': round(self.last_lag * 1000, 3),
+            'max_lag_ms': round(self.max_lag * 1000, 3),
+            'avg_lag_ms': round(self._total_lag * 1000 / self.fired, 3) if self.fired else 0.0
+        }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                due = self._heap[0][0]
+                now = time.monotonic()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                _, _, callback, args = heapq.heappop(self._heap)
+
+            lag = now - due
+            self.fired += 1
+            self.last_lag = lag
+            self._total_lag += lag
+            if lag > self.max_lag:
+                self.max_lag = lag
+            self.lag.record(lag * 1e9)
+            try:
+                callback(*args)
+            except Exception:
+                traceback.print_exc()
@@ -0,0 +1,378 @@
+# 🐍 Traffic Client - pooled sync and asyncio SDK for the traffic RPC API
+
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from idempotency import HEADER as IDEMPOTENCY_HEADER
+from rpc_batch import INTERNAL_ERROR
+from state_codec import decode_states
+
+DEFAULT_URL = 'http://localhost:5000'
+DEFAULT_POOL_SIZE = 16
+DEFAULT_BATCH_SIZE = 100  # Calls per JSON-RPC batch in pipeline()
+
+class RpcError(Exception):
+    """A JSON-RPC error response for one call"""
+
+    def __init__(self, code, message, call_id=None):
+        super().__init__(f"[{code}] {message}")
+        self.code = code
+        self.message = message
+        self.call_id = call_id
+
+def rpc_call(call_id, method, params):
+    return {'jsonrpc': '2.0', 'id': call_id, 'method': method, 'params': params}
+
+def rpc_result(response):
+    if 'error' in response:
+        error = response['error']
+        raise RpcError(error.get('code'), error.get('message'), response.get('id'))
+    return response['result']
+
+def batch_results(ids, responses, raise_errors):
+    """Results of a batch in call order from the server's responses.
+
+    A single error object (e.g. a parse error) applies to every call; an error
+    with a null id stands in for a call that got no response of its own.
+    """
+    if isinstance(responses, dict) and 'error' in responses:
+        by_id, fallback = {}, responses
+    elif isinstance(responses, list):
+        by_id = {response.get('id'): response for response in responses
+                 if isinstance(response, dict) and response.get('id') is not None}
+        fallback = next((response for response in responses
+                         if isinstance(response, dict) and response.get('id') is None and 'error' in response), None)
+    else:
+        by_id, fallback = {}, None
+    results = []
+    for call_id in ids:
+        response = by_id.get(call_id)
+        try:
+            if response is not None:
+                results.append(rpc_result(response))
+            elif fallback is not None:
+                error = fallback['error']
+                raise RpcError(error.get('code'), error.get('message'), call_id)
+            else:
+                raise RpcError(INTERNAL_ERROR, 'No response for this call', call_id)
+        except RpcError as exc:
+            if raise_errors:
+                raise
+            results.append(exc)
+    return results
+
+def frame_events(frame):
+    """Split a coalesced 'frame' into the ('update', state) and ('log_update', delta) events it carries"""
+    states = frame.get('states') or []
+    if not isinstance(states, list):
+        states = decode_states(states)  # Binary frames pack states with state_codec
+    for state in states:
+        yield 'update', state
+    if frame.get('logs') or frame.get('stats') is not None:
+        yield 'log_update', {'logs': frame.get('logs') or [], 'stats': frame.get('stats'),
+                             'reset': frame.get('reset', False)}
+
+class Batch:
+    """Calls collected client-side and sent as one JSON-RPC batch.
+
+    Each call method returns the index of its result in execute()'s list.
+    """
+
+    def __init__(self, junction_id=None):
+        self._junction_id = junction_id
+        self.calls = []
+
+    def call(self, method, **params):
+        if self._junction_id is not None:
+            params.setdefault('junction_id', self._junction_id)
+        self.calls.append((method, params))
+        return len(self.calls) - 1
+
+    def control_vehicle(self, road_id, junction_id=None):
+        return self.call('control_vehicle', road_id=road_id, **junction(junction_id))
+
+    def control_pedestrian(self, crossing_id, junction_id=None):
+        return self.call('control_pedestrian', crossing_id=crossing_id, **junction(junction_id))
+
+    def status(self, junction_id=None):
+        return self.call('status', **junction(junction_id))
+
+def junction(junction_id):
+    return {'junction_id': junction_id} if junction_id is not None else {}
+
+class TrafficClient:
+    """Blocking client over a keep-alive requests.Session.
+
+    One pool of pool_size connections is shared by every call; pipeline()
+    keeps that many JSON-RPC batches in flight from worker threads, so a single
+    process can issue thousands of commands per second. Results are the
+    server's own dicts; a rejected command is {'success': False, ...}, while
+    transport failures raise requests exceptions and JSON-RPC errors raise
+    RpcError. Control calls given an idempotency_key are safe to retry: the
+    server replays the first response instead of acting twice.
+    """
+
+    def __init__(self, base_url=DEFAULT_URL, junction_id=None, pool_size=DEFAULT_POOL_SIZE, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.junction_id = junction_id
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._ids = itertools.count(1)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        self.session.close()
+
+    def _params(self, junction_id=None, **params):
+        junction_id = junction_id if junction_id is not None else self.junction_id
+        params.update(junction(junction_id))
+        return params
+
+    def _post(self, path, body, idempotency_key=None):
+        headers = {IDEMPOTENCY_HEADER: idempotency_key} if idempotency_key else None
+        response = self.session.post(self.base_url + path, json=body, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def control_vehicle(self, road_id, junction_id=None, idempotency_key=None):
+        return self._post('/api/control_vehicle', self._params(junction_id, road_id=road_id), idempotency_key)
+
+    def control_pedestrian(self, crossing_id, junction_id=None, idempotency_key=None):
+        return self._post('/api/control_pedestrian', self._params(junction_id, crossing_id=crossing_id),
+                          idempotency_key)
+
+    def status(self, junction_id=None, since=None, timeout=None):
+        """System status; with since=<version> waits for a newer state and returns None on timeout"""
+        params = self._params(junction_id)
+        wait = 0
+        if since is not None:
+            params['since'] = since
+            params['timeout'] = timeout or 0
+            wait = float(params['timeout'])
+        response = self.session.get(self.base_url + '/api/status', params=params, timeout=self.timeout + wait)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def transition(self, transition_id=None, junction_id=None):
+        """Progress of a signal sequence (the 'transition' in a control response), or all of a junction's"""
+        params = self._params(junction_id)
+        if transition_id:
+            params['transition_id'] = transition_id
+        response = self.session.get(self.base_url + '/api/transition', params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def logs(self, **filters):
+        """GET /api/logs with journal filters (cursor, type, action, success, from, to)"""
+        response = self.session.get(self.base_url + '/api/logs', params=filters, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def call(self, method, **params):
+        """One JSON-RPC call"""
+        params = self._params(**params)
+        return rpc_result(self._post('/api/rpc', rpc_call(next(self._ids), method, params)))
+
+    def batch(self, junction_id=None):
+        return Batch(junction_id if junction_id is not None else self.junction_id)
+
+    def execute(self, batch, raise_errors=True):
+        """Send a Batch in one request; results in call order (RpcError instances if not raise_errors)"""
+        return self._execute(batch.calls, raise_errors)
+
+    def _execute(self, calls, raise_errors):
+        ids = [next(self._ids) for _ in calls]  # count() is safe to share between pipeline threads
+        payload = [rpc_call(call_id, method, self._params(**params))
+                   for call_id, (method, params) in zip(ids, calls)]
+        return batch_results(ids, self._post('/api/rpc', payload), raise_errors)
+
+    def pipeline(self, calls, batch_size=DEFAULT_BATCH_SIZE, raise_errors=False):
+        """Run (method, params) calls as JSON-RPC batches, pool_size batches in flight at once.
+
+        Results come back in call order; errors are returned as RpcError
+        instances unless raise_errors. Calls for the same junction keep their
+        order only within a batch, since batches run concurrently.
+        """
+        calls = list(calls)
+        chunks = [calls[start:start + batch_size] for start in range(0, len(calls), batch_size)]
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.pool_size, thread_name_prefix='traffic-client')
+        results = []
+        for chunk_results in self._executor.map(lambda chunk: self._execute(chunk, raise_errors), chunks):
+            results.extend(chunk_results)
+        return results
+
+    def subscribe(self, binary=False, events=('update', 'log_update')):
+        """Blocking iterator of (event, data) from the dashboard feed; close() it to disconnect"""
+        import socketio
+
+        client = socketio.Client(reconnection=True, http_session=self.session)
+        inbox = queue.Queue()
+        client.on('frame', inbox.put)
+        client.connect(self.base_url, auth={'binary': binary})
+        try:
+            while True:
+                for event, data in frame_events(inbox.get()):
+                    if event in events:
+                        yield event, data
+        finally:
+            client.disconnect()
+
+class AsyncTrafficClient:
+    """asyncio client over one aiohttp session with a keep-alive pool of pool_size connections.
+
+    Same calls as TrafficClient, as coroutines; pipeline() keeps pool_size
+    JSON-RPC batches in flight on the event loop.
+    """
+
+    def __init__(self, base_url=DEFAULT_URL, junction_id=None, pool_size=DEFAULT_POOL_SIZE, timeout=10):
+        import aiohttp
+
+        self._aiohttp = aiohttp
+        self.base_url = base_url.rstrip('/')
+        self.junction_id = junction_id
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+        self._ids = itertools.count(1)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def session(self):
+        if self._session is None:  # Created lazily so it binds to the running loop
+            aiohttp = self._aiohttp
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size),
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _params(self, junction_id=None, **params):
+        junction_id = junction_id if junction_id is not None else self.junction_id
+        params.update(junction(junction_id))
+        return params
+
+    async def _post(self, path, body, idempotency_key=None):
+        headers = {IDEMPOTENCY_HEADER: idempotency_key} if idempotency_key else None
+        async with self.session.post(self.base_url + path, json=body, headers=headers) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def control_vehicle(self, road_id, junction_id=None, idempotency_key=None):
+        return await self._post('/api/control_vehicle', self._params(junction_id, road_id=road_id), idempotency_key)
+
+    async def control_pedestrian(self, crossing_id, junction_id=None, idempotency_key=None):
+        return await self._post('/api/control_pedestrian', self._params(junction_id, crossing_id=crossing_id),
+                                idempotency_key)
+
+    async def status(self, junction_id=None, since=None, timeout=None):
+        """System status; with since=<version> waits for a newer state and returns None on timeout"""
+        params = self._params(junction_id)
+        wait = 0
+        if since is not None:
+            params['since'] = str(since)
+            params['timeout'] = str(timeout or 0)
+            wait = float(timeout or 0)
+        request_timeout = self._aiohttp.ClientTimeout(total=self.timeout + wait)
+        async with self.session.get(self.base_url + '/api/status', params=params, timeout=request_timeout) as response:
+            if response.status == 304:
+                return None
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def transition(self, transition_id=None, junction_id=None):
+        """Progress of a signal sequence (the 'transition' in a control response), or all of a junction's"""
+        params = self._params(junction_id)
+        if transition_id:
+            params['transition_id'] = transition_id
+        async with self.session.get(self.base_url + '/api/transition', params=params) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def logs(self, **filters):
+        """GET /api/logs with journal filters (cursor, type, action, success, from, to)"""
+        params = {key: str(value) for key, value in filters.items()}
+        async with self.session.get(self.base_url + '/api/logs', params=params) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def call(self, method, **params):
+        """One JSON-RPC call"""
+        params = self._params(**params)
+        return rpc_result(await self._post('/api/rpc', rpc_call(next(self._ids), method, params)))
+
+    def batch(self, junction_id=None):
+        return Batch(junction_id if junction_id is not None else self.junction_id)
+
+    async def execute(self, batch, raise_errors=True):
+        """Send a Batch in one request; results in call order (RpcError instances if not raise_errors)"""
+        return await self._execute(batch.calls, raise_errors)
+
+    async def _execute(self, calls, raise_errors):
+        ids = [next(self._ids) for _ in calls]
+        payload = [rpc_call(call_id, method, self._params(**params))
+                   for call_id, (method, params) in zip(ids, calls)]
+        return batch_results(ids, await self._post('/api/rpc', payload), raise_errors)
+
+    async def pipeline(self, calls, batch_size=DEFAULT_BATCH_SIZE, raise_errors=False):
+        """Run (method, params) calls as JSON-RPC batches, pool_size batches in flight at once"""
+        import asyncio
+
+        calls = list(calls)
+        chunks = [calls[start:start + batch_size] for start in range(0, len(calls), batch_size)]
+        gate = asyncio.Semaphore(self.pool_size)
+
+        async def run(chunk):
+            async with gate:
+                return await self._execute(chunk, raise_errors)
+
+        results = []
+        for chunk_results in await asyncio.gather(*(run(chunk) for chunk in chunks)):
+            results.extend(chunk_results)
+        return results
+
+    async def subscribe(self, binary=False, events=('update', 'log_update')):
+        """Async iterator of (event, data) from the dashboard feed; disconnects when the loop exits"""
+        import asyncio
+        import socketio
+
+        client = socketio.AsyncClient(reconnection=True, http_session=self.session)
+        inbox = asyncio.Queue()
+        client.on('frame', inbox.put_nowait)
+        await client.connect(self.base_url, auth={'binary': binary})
+        try:
+            while True:
+                for event, data in frame_events(await inbox.get()):
+                    if event in events:
+                        yield event, data
+        finally:
+            await client.disconnect()
@@ -0,0 +1,492 @@
+# 🏗️ Traffic Service - the plumbing every traffic server shares, around its own phase plan
+
+import argparse
+import datetime
+import os
+import threading
+from flask import Flask, Response, jsonify, request, render_template_string
+from flask_socketio import SocketIO, join_room
+from flask_cors import CORS
+from junction_registry import JunctionRegistry
+from phase_engine import PhaseEngine
+from timer_scheduler import TimerScheduler
+from rpc_batch import execute_batch
+from log_store import LogRing, DEFAULT_CAPACITY
+from broadcaster import BroadcastCoalescer, DEFAULT_TICK_MS, JSON_ROOM, BINARY_ROOM, frame_room
+from event_publisher import EventPublisher
+from metrics import (MetricsRegistry, process_cpu_seconds, process_resident_bytes, process_open_fds,
+                     process_socket_count)
+from memory_probe import MemoryProbe
+from sim_clock import RealClock
+from static_pages import StaticPages, SOCKETIO_CLIENT_PATH
+from long_poll import LongPoll
+from event_journal import EventJournal, DEFAULT_FSYNC_MS
+from log_index import LogIndex, QUERY_PARAMS, parse_filters
+from log_export import ExportStream
+from idempotency import IdempotencyCache, DEFAULT_TTL_S, with_idempotency_key
+from request_errors import RequestError, NOT_FOUND, number
+from payload_cache import PayloadCache, FastJSONProvider, SocketJSON, dumps, join_object
+
+INITIAL_STATE = {
+    'road1': 'RED',
+    'road2': 'GREEN',
+    'pedestrian1': 'RED',
+    'pedestrian2': 'RED'
+}
+JOURNAL_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'journal')
+JOURNAL_PAGE_LIMIT = 1000
+RESUME_LIMIT = 1000  # Most entries a reconnecting dashboard is sent in one resume reply
+READ_ONLY_METHODS = ('status', 'transition')  # JSON-RPC methods that never create a junction
+DEFAULT_HOST = '127.0.0.1'
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')  # Where the Werkzeug debugger may run
+
+class TrafficService:
+    """Junctions, phase engine, logs, journal, metrics and routes for one traffic server.
+
+    A server brings its phase plan, its request counters (count_logs, if given,
+    counts every queued log record), its commands and its dashboard; the rest
+    is here. scheduler, clock, console and emit_event are looked up on every
+    use, so the asyncio stack or a simulation can swap them after startup.
+    """
+
+    def __init__(self, import_name, name, plan, counters, count_logs=None):
+        self.name = name
+        self.counters = counters
+        self.count_logs = count_logs
+        self.server_start_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        self.app = Flask(import_name)
+        self.app.json = FastJSONProvider(self.app)
+        CORS(self.app)
+        self.socketio = SocketIO(self.app, cors_allowed_origins="*", json=SocketJSON)
+        self.emit_event = self.socketio.emit  # Outbound Socket.IO events - the asyncio stack swaps in its own
+
+        self.metrics = MetricsRegistry()  # Prometheus metrics served at /metrics
+        # Allocation tracing for soak tests - costly, so only with TRAFFIC_DEBUG_MEMORY=1
+        self.memory_probe = MemoryProbe() if os.environ.get('TRAFFIC_DEBUG_MEMORY') else None
+        self.clock = RealClock()  # Log, journal and transition timestamps - a simulation swaps in a VirtualClock
+
+        # Traffic state - one entry per junction, each with its own lock
+        self.registry = JunctionRegistry(INITIAL_STATE, clock=lambda: self.clock.time())
+        self.scheduler = TimerScheduler()  # One timer thread drives every signal sequence
+
+        # Ring buffer of compact log records (capacity via TRAFFIC_LOG_CAPACITY)
+        self.log_ring = LogRing(int(os.environ.get('TRAFFIC_LOG_CAPACITY', DEFAULT_CAPACITY)))
+
+        # Dashboard updates are merged into one 'frame' per tick (TRAFFIC_BROADCAST_TICK_MS)
+        self.broadcaster = BroadcastCoalescer(lambda event, data, room: self.emit_event(event, data, to=room),
+                                              int(os.environ.get('TRAFFIC_BROADCAST_TICK_MS', DEFAULT_TICK_MS)),
+                                              log_epoch=self.log_ring.epoch)
+
+        # Durable history of every log record and state transition; one directory per server process
+        self.journal = EventJournal(os.environ.get('TRAFFIC_JOURNAL_DIR', os.path.join(JOURNAL_ROOT, name)),
+                                    int(os.environ.get('TRAFFIC_JOURNAL_FSYNC_MS', DEFAULT_FSYNC_MS)),
+                                    clock=lambda: self.clock.time_ns())
+
+        # Type, action, outcome and time indexes over the whole journal, rebuilt from it at startup
+        self.log_index = LogIndex()
+        self.journal.subscribe(self.log_index.add)
+
+        self.payload_cache = PayloadCache()  # Serialized status fragments, shared by readers of one version
+        # Responses to control commands sent with an Idempotency-Key, replayed to retries
+        self.idempotency = IdempotencyCache(float(os.environ.get('TRAFFIC_IDEMPOTENCY_TTL_S', DEFAULT_TTL_S)))
+
+        # Everything slow (log storage, frames, stdout) runs on this thread, never under a junction lock
+        self.publisher = EventPublisher({
+            'state': self.publish_state,
+            'logs': self.add_log_entries,
+            'print': print
+        })
+        self.console = lambda message: self.publisher.post('print', message)
+
+        # Signal phases run on the scheduler thread; under the junction lock they only mutate the
+        # signals and queue a snapshot, log record and console line for the publisher
+        self.engine = PhaseEngine(plan, lambda: self.scheduler,
+                                  lambda snapshot, committed_ns: self.publisher.post('state', snapshot, committed_ns),
+                                  self.add_log, lambda message: self.console(message))
+
+        self.rpc_methods = {
+            'status': self.read_junction_state,
+            'transition': self.read_transitions
+        }
+        timed = self.metrics.timed
+        self.json_rpc = timed('/api/rpc')(self.json_rpc)
+        self.transition_rpc = timed('/api/transition')(self.transition_rpc)
+        self.status_rpc = timed('/api/status')(self.status_rpc)
+        self.logs_rpc = timed('/api/logs')(self.logs_rpc)
+        self.export_logs_rpc = timed('/api/logs/export')(self.export_logs_rpc)
+        self.clear_logs_rpc = timed('/api/clear_logs')(self.clear_logs_rpc)
+        self.api_routes = [
+            ('POST', '/api/rpc', self.json_rpc),
+            ('GET', '/api/status', self.status_rpc),
+            ('GET', '/api/transition', self.transition_rpc),
+            ('GET', '/api/logs', self.logs_rpc),
+            ('GET', '/api/logs/export', self.export_logs_rpc),
+            ('POST', '/api/clear_logs', self.clear_logs_rpc)
+        ]
+        if self.memory_probe is not None:
+            self.api_routes.append(('GET', '/debug/memory', self.debug_memory_rpc))
+        self.socket_handlers = {
+            'resume': self.resume_logs
+        }
+
+        self.connected_sockets = {}  # Connected Socket.IO clients and the frames room each joined
+        self.pages = StaticPages()   # Rendered and compressed once; requests pick a variant and check the ETag
+        self.pages.add_socketio_client()
+        self._register_metrics()
+        self._register_flask()
+
+    # Logging
+
+    def make_log_entry(self, log_type, action, message, success=True, junction_id=None):
+        """Build a log record stamped with the current time in nanoseconds"""
+        return (log_type, action, message, success, junction_id, self.clock.time_ns())
+
+    def add_log(self, log_type, action, message, success=True, junction_id=None):
+        """Add a log entry with timestamp and details"""
+        self.queue_log_entries([self.make_log_entry(log_type, action, message, success, junction_id)])
+
+    def queue_log_entries(self, records, reset=False):
+        """Count log records and hand them to the publisher thread; safe to call with a junction lock held"""
+        if self.count_logs is not None:
+            self.count_logs(records)
+        self.publisher.post('logs', records, reset)
+
+    def system_stats(self):
+        """Current totals across all counter shards"""
+        stats = self.counters.snapshot()
+        stats['server_start_time'] = self.server_start_time
+        return stats
+
+    def add_log_entries(self, records, reset=False):
+        """Publisher thread: store log records in one ring append and queue them for the next frame"""
+        if reset:
+            self.log_ring.clear()
+        self.journal.append_logs(records)
+        seqs = self.log_ring.extend(records)
+        # Queue the new entries for the next dashboard frame; clients track the last seq they saw
+        self.broadcaster.publish_logs(self.log_ring.since(seqs[0] - 1, len(seqs)), self.system_stats(), reset)
+
+    def publish_state(self, snapshot, committed_ns=None):
+        """Publisher thread: journal the snapshot, queue it for the next frame and wake long-polls"""
+        self.journal.append_state(snapshot)
+        self.broadcaster.publish_state(snapshot, committed_ns)
+        self.registry.notify(snapshot)
+
+    # Commands - called with the junction lock held, by the single-command routes and by /api/rpc
+
+    def command(self, method, start):
+        """Serve start(junction, params, log) as JSON-RPC method and POST /api/<method>.
+
+        Returns the framework-neutral handler, timed and honouring Idempotency-Key.
+        """
+        def handler(data):
+            junction = self.registry.get(data.get('junction_id'))
+            with junction.lock:
+                return start(junction, data)
+        handler.__name__ = f'{method}_rpc'  # Idempotency keys are scoped per handler name
+
+        path = f'/api/{method}'
+        handler = self.metrics.timed(path)(self.idempotency.idempotent(handler))
+        self.rpc_methods[method] = start
+        self.api_routes.insert(0, ('POST', path, handler))
+        self.app.add_url_rule(path, method, lambda: jsonify(handler(with_idempotency_key(request.get_json(),
+                                                                                          request.headers))),
+                              methods=['POST'])
+        return handler
+
+    def find_junction(self, junction_id):
+        """An existing junction, for read paths; an unknown id is a 404, not a new junction"""
+        junction = self.registry.find(junction_id)
+        if junction is None:
+            raise RequestError(f"Unknown junction {junction_id}", NOT_FOUND)
+        return junction
+
+    def read_junction_state(self, junction, params, log=None):
+        return junction.snapshot()
+
+    def read_transitions(self, junction, params, log=None):
+        """One transition by transition_id, or the latest on every channel of the junction"""
+        transition_id = params.get('transition_id')
+        if transition_id:
+            transition = junction.find_transition(transition_id)
+            if transition is None:
+                return {"success": False, "message": f"Unknown transition {transition_id}",
+                        "junction_id": junction.junction_id}
+            return transition.status()
+        return {"junction_id": junction.junction_id,
+                "transitions": {channel: transition.status() for channel, transition in junction.transitions.items()}}
+
+    # API handlers - framework-neutral so the Flask routes and the asyncio stack share them
+
+    def json_rpc(self, payload):
+        """JSON-RPC 2.0 endpoint - a single call or a batch across any number of junctions"""
+        return execute_batch(payload, self.registry, self.rpc_methods, self.make_log_entry, self.queue_log_entries,
+                             READ_ONLY_METHODS)
+
+    def transition_rpc(self, params):
+        """Progress of the junction's signal sequences - ?transition_id= from a control response, or all"""
+        junction = self.find_junction(params.get('junction_id'))
+        with junction.lock:
+            return self.read_transitions(junction, params)
+
+    def status_rpc(self, params):
+        """System status; with ?since=<version> it waits up to ?timeout= seconds for the
+        junction state to move past that version, or answers 304"""
+        junction = self.find_junction(params.get('junction_id'))
+        if 'since' in params:
+            return LongPoll(junction, number(params, 'since', 0), number(params, 'timeout', 0, float),
+                            lambda: self.status_snapshot(junction))
+        return self.status_snapshot(junction)
+
+    def current_state(self, junction):
+        with junction.lock:
+            return junction.snapshot()
+
+    def status_snapshot(self, junction):
+        """Status body as JSON bytes; state, logs and stats are reused until their version moves"""
+        log_ring = self.log_ring
+        cache = self.payload_cache
+        log_version = (log_ring.first_seq, log_ring.next_seq)  # Every counted request adds a log
+        cached = [
+            ('traffic_state', cache.get(('state', junction.junction_id), junction.version,
+                                        lambda: self.current_state(junction))),
+            ('logs', cache.get('logs', log_version, lambda: log_ring.tail(10))),  # Last 10 logs
+            ('stats', cache.get('stats', log_version, self.system_stats))
+        ]
+        live = {
+            'junctions': len(self.registry),
+            'scheduler': self.scheduler.stats(),
+            'broadcast': self.broadcaster.stats(),
+            'publisher': self.publisher.stats(),
+            'locks': self.registry.lock_stats(),
+            'payload_cache': cache.stats(),
+            'idempotency': self.idempotency.stats()
+        }
+        return join_object(cached + [(name, dumps(value)) for name, value in live.items()])
+
+    def logs_rpc(self, params):
+        """Get logs - the newest ?limit= entries, or those after ?since=<seq>;
+        ?cursor= or any filter queries the journal instead"""
+        if any(name in params for name in QUERY_PARAMS):
+            return self.journal_page(params)
+        limit = min(number(params, 'limit', 100), self.log_ring.capacity)
+        if 'since' in params:
+            logs = self.log_ring.since(number(params, 'since', 0), limit)
+        else:
+            logs = self.log_ring.tail(limit)
+        return {
+            'logs': logs,
+            'first_seq': self.log_ring.first_seq,
+            'last_seq': self.log_ring.last_seq,
+            'stats': self.system_stats()
+        }
+
+    def journal_page(self, params):
+        """Journal events after ?cursor= matching ?type= ?action= ?success= ?from= ?to=, oldest
+        first; pass next_cursor back for the next page"""
+        limit = min(max(number(params, 'limit', 100), 1), JOURNAL_PAGE_LIMIT)
+        seqs, next_cursor, more = self.log_index.query(cursor=number(params, 'cursor', 0), limit=limit,
+                                                       **parse_filters(params))
+        return {
+            'events': [self.journal.entry(seq) for seq in seqs],
+            'next_cursor': next_cursor,
+            'more': more,
+            'journal': self.journal.stats()
+        }
+
+    def export_logs_rpc(self, params):
+        """Stream journal events after ?cursor= matching the /api/logs filters, as ?format=ndjson or csv"""
+        return ExportStream(self.journal, self.log_index, parse_filters(params), number(params, 'cursor', 0),
+                            params.get('format', 'ndjson'))
+
+    def clear_logs_rpc(self, params):
+        """Clear all logs"""
+        self.queue_log_entries([self.make_log_entry('SYSTEM', 'Clear Logs', 'All logs cleared by user')], reset=True)
+        return {"success": True, "message": "Logs cleared successfully"}
+
+    def resume_logs(self, data):
+        """Socket.IO 'resume' - the entries a (re)connecting dashboard missed since its last seen seq.
+
+        A last_seq from another log_epoch (a previous server run) counts as none at all.
+        """
+        data = data or {}
+        try:
+            after_seq = number(data, 'last_seq', 0) if data.get('last_seq') else 0
+            junction = self.find_junction(data.get('junction_id'))
+        except RequestError as exc:
+            return exc.body()  # The ack has no status code
+        with junction.lock:
+            state = junction.snapshot()
+        if after_seq <= 0 or data.get('log_epoch') not in (None, self.log_ring.epoch):
+            logs, reset = self.log_ring.tail(10), True  # Fresh dashboard, or one from before a restart
+        else:
+            logs, reset = self.log_ring.delta(after_seq, RESUME_LIMIT)
+        return {
+            'logs': logs,
+            'reset': reset,
+            'log_epoch': self.log_ring.epoch,
+            'more': len(logs) == RESUME_LIMIT,
+            'stats': self.system_stats(),
+            'traffic_state': state
+        }
+
+    def debug_memory_rpc(self, params):
+        """Threads, RSS, fds and the allocation sites that grew most; ?reset=1 starts a new baseline"""
+        if params.get('reset'):
+            self.memory_probe.reset()
+        return self.memory_probe.sample(number(params, 'limit', 20))
+
+    # Socket.IO subscribers
+
+    def socket_connected(self, sid, auth):
+        room = frame_room(auth)  # JSON frames, or packed binary states if the client asked
+        self.connected_sockets[sid] = room
+        return room
+
+    def socket_disconnected(self, sid):
+        self.connected_sockets.pop(sid, None)
+
+    def connected_socket_counts(self):
+        counts = {(('room', JSON_ROOM),): 0, (('room', BINARY_ROOM),): 0}
+        for room in list(self.connected_sockets.values()):
+            counts[(('room', room),)] += 1
+        return counts
+
+    def _register_metrics(self):
+        metrics, registry, broadcaster = self.metrics, self.registry, self.broadcaster
+        journal, log_ring = self.journal, self.log_ring
+        metrics.register_histogram('lock_wait_seconds', 'Time spent waiting for a junction lock', registry.lock_wait)
+        metrics.register_histogram('lock_hold_seconds', 'Time a junction lock was held', registry.lock_hold)
+        metrics.register_histogram('scheduler_lag_seconds', 'How late timed signal phases fired',
+                                   lambda: self.scheduler.lag)
+        for room, histogram in broadcaster.emit_latency.items():
+            metrics.register_histogram('emit_duration_seconds', 'Time to emit one Socket.IO frame to a whole room',
+                                       histogram, room=room)
+        metrics.register_histogram('frame_delay_seconds',
+                                   'Time from the first change in a tick to its frame being emitted',
+                                   broadcaster.frame_delay)
+        metrics.gauge('connected_sockets', 'Connected Socket.IO clients by frames room', self.connected_socket_counts)
+        metrics.gauge('junctions', 'Junctions created so far', lambda: len(registry))
+        metrics.gauge('scheduler_queue_depth', 'Timed phases waiting to fire',
+                      lambda: self.scheduler.stats()['queue_depth'])
+        metrics.gauge('publisher_queue_depth', 'Events waiting for the publisher thread',
+                      lambda: self.publisher.stats()['queue_depth'])
+        metrics.gauge('journal_unsynced_events', 'Journaled events not yet fsynced',
+                      lambda: journal.last_seq - journal.synced_seq)
+        metrics.gauge('process_cpu_seconds', 'CPU time used by the server process', process_cpu_seconds)
+        metrics.gauge('process_resident_memory_bytes', 'Resident memory of the server process', process_resident_bytes)
+        metrics.gauge('process_threads', 'Live threads in the server process', threading.active_count)
+        metrics.gauge('process_open_fds', 'Open file descriptors of the server process', process_open_fds)
+        metrics.gauge('process_open_sockets', 'Open sockets of the server process', process_socket_count)
+        metrics.gauge('log_ring_entries', 'Log records held in memory', lambda: len(log_ring))
+        metrics.gauge('log_ring_capacity', 'Most log records held in memory', lambda: log_ring.capacity)
+        metrics.gauge('journal_events', 'Events journaled so far', lambda: journal.last_seq)
+
+    # Flask mode
+
+    def _register_flask(self):
+        app, socketio = self.app, self.socketio
+
+        @app.errorhandler(RequestError)
+        def request_error(exc):
+            return jsonify(exc.body()), exc.status
+
+        @socketio.on('connect')
+        def on_connect(auth=None):
+            join_room(self.socket_connected(request.sid, auth))
+
+        @socketio.on('disconnect')
+        def on_disconnect(reason=None):
+            self.socket_disconnected(request.sid)
+
+        @socketio.on('resume')
+        def on_resume(data=None):
+            return self.resume_logs(data)  # Returned to the client as the ack
+
+        @app.route('/api/rpc', methods=['POST'])
+        def rpc():
+            response = self.json_rpc(request.get_json(silent=True))
+            if response is None:
+                return '', 204  # Only notifications
+            return jsonify(response)
+
+        @app.route('/api/transition')
+        def get_transition():
+            return jsonify(self.transition_rpc(request.args))
+
+        @app.route('/api/status')
+        def get_status():
+            result = self.status_rpc(request.args)
+            if isinstance(result, LongPoll):
+                result = result.wait()  # Parks this request thread until the state changes
+                if result is None:
+                    return '', 304
+            return Response(result, mimetype='application/json')
+
+        @app.route('/api/logs')
+        def get_logs():
+            return jsonify(self.logs_rpc(request.args))
+
+        @app.route('/api/logs/export')
+        def export_logs():
+            headers, chunks = self.export_logs_rpc(request.args).open(request.headers.get('Accept-Encoding'))
+            return Response(chunks, headers=headers)
+
+        if self.memory_probe is not None:
+            app.add_url_rule('/debug/memory', 'debug_memory', lambda: jsonify(self.debug_memory_rpc(request.args)))
+
+        @app.route('/metrics')
+        def prometheus_metrics():
+            return Response(self.metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8',
+                            headers={'Cache-Control': 'no-store'})
+
+        @app.route('/api/clear_logs', methods=['POST'])
+        def clear_logs():
+            return jsonify(self.clear_logs_rpc(request.args))
+
+        @app.route('/')
+        def dashboard():
+            return self.serve_page('/')
+
+        @app.route(SOCKETIO_CLIENT_PATH)
+        def socketio_client():
+            return self.serve_page(SOCKETIO_CLIENT_PATH)
+
+    def add_dashboard(self, html):
+        """Render the server's dashboard template once and serve it at /"""
+        with self.app.app_context():
+            self.pages.add('/', render_template_string(html))
+
+    def serve_page(self, path):
+        status, headers, body = self.pages.respond(path, request.headers)
+        return Response(body, status, headers)
+
+    def main(self, description, start_message, *banner):
+        """Command line entry point: Flask mode, or the asyncio stack with --async.
+
+        Both listen on localhost unless --host says otherwise; the Werkzeug
+        debugger is only enabled on a loopback address, never on one the
+        network can reach.
+        """
+        parser = argparse.ArgumentParser(description=description)
+        parser.add_argument('--async', dest='use_async', action='store_true',
+                            help='serve with the asyncio (aiohttp + python-socketio) stack')
+        parser.add_argument('--port', type=int, default=5000)
+        parser.add_argument('--host', default=DEFAULT_HOST,
+                            help='address to listen on (0.0.0.0 for every interface)')
+        args = parser.parse_args()
+
+        if args.use_async:
+            from async_serving import AsyncTrafficServer
+            server = AsyncTrafficServer(self)
+        self.add_log('SYSTEM', 'Server Start', start_message)
+        for line in banner:
+            print(line.format(port=args.port))
+        if args.use_async:
+            server.run(host=args.host, port=args.port)
+        else:
+            # No reloader: its parent and child process would both open the journal. Flask mode is
+            # the development server by design, so it also starts without a TTY (CI, nohup, benches)
+            self.socketio.run(self.app, debug=args.host in LOOPBACK_HOSTS, use_reloader=False,
+                              port=args.port, host=args.host, allow_unsafe_werkzeug=True)